@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+This package defines functions which scrape the Amherst College
+departmental course catalogs to create a file, data.json, which plugs
+into the Oxford Internet Institute's interactive network viewer.  This
+file contains the node and edge attributes of the network of prerequisites
+at Amherst College: which courses are required by which.
+
+Run it with `python -m amherstgraph` (see `python -m amherstgraph --help`),
+and serve views of what it built with `python -m amherstgraph.server`.
+
+Importing the package does nothing but define it: each submodule, with the
+libraries it needs (lxml, urllib3, igraph), is imported the first time one
+of its names is used, e.g. `amherstgraph.make_course_graph`.  Settings are
+module constants and should be changed on their submodule, e.g.
+`amherstgraph.web.OFFLINE = True`.
+
+Created on Mon Jan 11 13:26:45 2016
+
+@author: steven
+"""
+
+import importlib
+
+# the names each submodule defines, which are available from the package
+SUBMODULE_NAMES = {
+    'files': ('write_atomically', 'get_fingerprint'),
+    'report': ('REPORT_PATH', 'PROFILE', 'PROFILE_PATH', 'LATENCY_BUCKETS',
+               'STATS_LOCK', 'OPEN_STAGES', 'make_http_stats', 'RUN_REPORT',
+               'reset_run_report', 'record_http', 'add_counts', 'stage',
+               'count_results', 'instrumented', 'get_cache_hit_ratio',
+               'write_run_report', 'start_profiler', 'stop_profiler'),
+    'web': ('MAX_WORKERS', 'MAX_PER_HOST', 'RETRIES', 'BACKOFF', 'CACHE_DIR',
+            'CACHE_TTL', 'CACHE_MAX_AGE', 'CACHE_MAX_BYTES', 'OFFLINE',
+            'HOST_OVERRIDES', 'HTTP', 'HTTP_LOCK', 'get_http',
+            'get_cache_paths', 'get_request_url', 'read_cache',
+            'write_cache', 'fetch', 'prune_cache', 'fetch_all'),
+    'journal': ('JOURNAL_PATH', 'JOURNAL_MAX_AGE', 'JOURNAL_LOCK',
+                'PAGE_KINDS', 'load_journal', 'record_page',
+                'get_finished_pages', 'get_failed_pages', 'get_coverage',
+                'finish_journal'),
+    'records': ('URL_PREFIX', 'STRING_TABLE', 'share_string', 'share_strings',
+                'CourseRecord'),
+    'crawl': ('get_catalog_urls', 'get_date', 'get_catalog_pages',
+              'iter_pages', 'record_failure', 'get_courses',
+              'get_related_courses', 'add_related_departments',
+              'get_course_code',
+              'get_semester_key', 'get_most_recent_course_urls',
+              'get_url_departments'),
+    'parse': ('COURSE_LIST_ID', 'TEXT_XPATH', 'CHARSET_PATTERN',
+              'PAGE_CHUNK_SIZE', 'read_course_list', 'parse_course_page',
+              'get_course_info'),
+    'prereqs': ('PREREQ_TOKEN_PATTERN', 'PREREQ_KINDS', 'PREREQ_CACHE_SIZE',
+                'CHOICE_WORDS', 'RENUMBERED_WORDS', 'EXCLUDING_WORDS',
+                'DEPT_ALIASES', 'resolve_dept', 'read_requisite_line',
+                'get_course_prereqs', 'get_prereqs', 'test_prereqs'),
+    'graph': ('make_course_graph', 'make_subgraphs', 'make_view_subgraph',
+              'make_subgraph'),
+    'layout': ('LAYOUT_CACHE_DIR', 'GLOBAL_LAYOUT',
+               'get_structure_fingerprint', 'get_sugiyama_layout',
+               'add_global_layout', 'get_layout', 'prune_layout_cache'),
+    'export': ('make_color', 'get_rgb', 'make_json_nodes', 'make_json_edges',
+               'make_json_parts', 'make_json',
+               'find_or_make_directory_address', 'STORE_DIR', 'SHARED_STORE',
+               'store_attributes', 'move_attributes_to_store',
+               'drop_edge_attributes', 'prune_store', 'GZIP_LEVEL',
+               'BROTLI_QUALITY', 'encode_json', 'get_sidecar_compressors',
+               'write_json_stream', 'export_json', 'EXPORT_JOBS',
+               'WORKER_STATE', 'init_export_worker', 'export_json_task',
+               'record_department', 'export_departments'),
+    'reachability': ('EXPORT_REACHABILITY', 'REACHABILITY_KINDS', 'iter_bits',
+                     'make_reachability_index', 'add_reachability_index',
+                     'get_ancestor_bits', 'get_descendant_bits',
+                     'get_all_prerequisites', 'get_unlocked_courses',
+                     'is_prerequisite', 'get_cycles',
+                     'get_subgraph_ancestors'),
+    'search': ('EXPORT_SEARCH_INDEX', 'WORD_PATTERN', 'get_words',
+               'get_course_words', 'make_search_index'),
+    'incremental': ('MANIFEST_PATH', 'INCREMENTAL', 'PREREQ_FORMAT',
+                    'EXPORT_FORMAT', 'add_fingerprints', 'load_manifest',
+                    'save_manifest', 'get_prereqs_incremental',
+                    'get_export_settings', 'get_subgraph_fingerprint',
+                    'export_changed_json'),
+    'departments': ('DEPT_CODES', 'DEPTS', 'DEPT_SET', 'get_dept_strings'),
+    'database': ('DATABASE_PATH', 'SCHEMA', 'connect_database',
+                 'get_offering', 'get_catalog_semesters', 'get_placeholders',
+                 'write_catalog', 'write_courses', 'write_prereqs',
+                 'load_course_details', 'load_prereqs',
+                 'get_latest_offerings', 'get_department_courses',
+                 'get_course_history'),
+    'server': ('SERVER_HOST', 'SERVER_PORT', 'VIEW_CACHE_BYTES', 'MAX_HOPS',
+               'VIEWER_DIR', 'SERVER_STATE', 'VIEW_CACHE', 'VIEW_CACHE_STATS',
+               'PENDING_VIEWS', 'RENDER_EXECUTOR', 'STATUS_REASONS',
+               'load_server_state', 'get_view', 'render_view', 'cache_view',
+               'get_view_payload', 'read_viewer_file', 'respond',
+               'handle_connection', 'serve'),
+    'pipeline': ('STAGES', 'STATE_DIR', 'save_state', 'load_state',
+                 'get_catalog_department', 'load_courses',
+                 'run_catalog_stage', 'run_courses_stage', 'run_prereqs_stage',
+                 'build_course_graph', 'load_course_graph', 'run_export_stage',
+                 'run_pipeline')}
+
+SUBMODULES = {name: submodule for submodule, names in SUBMODULE_NAMES.items()
+              for name in names}
+__all__ = sorted(SUBMODULES)
+
+
+def __getattr__(name):
+    """
+    imports a submodule, or the submodule defining a name, the first time it
+    is used
+    """
+    if name in SUBMODULE_NAMES:
+        return importlib.import_module('.' + name, __name__)
+    if name not in SUBMODULES:
+        raise AttributeError("module {!r} has no attribute {!r}".format(
+            __name__, name))
+    submodule = importlib.import_module('.' + SUBMODULES[name], __name__)
+    return getattr(submodule, name)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(SUBMODULE_NAMES) | set(SUBMODULES))
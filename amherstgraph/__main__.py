@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Builds the prerequisite networks of the Amherst College departments.
+
+usage: python -m amherstgraph [--stages STAGE [STAGE ...]]
+                              [--dept DEPT [DEPT ...]] [--jobs N]
+                              [--workers N] [--full] [--offline]
+                              [--profile PROFILER]
+"""
+
+import argparse
+import sys
+
+from .departments import get_dept_strings
+from .pipeline import STAGES, run_pipeline
+
+
+def parse_args(argv=None):
+    "returns the parsed command line arguments"
+    parser = argparse.ArgumentParser(
+        prog='python -m amherstgraph',
+        description='Scrapes the Amherst College course catalogs and exports '
+        'the prerequisite network of each department as data.json.')
+    parser.add_argument('--stages', nargs='+', choices=STAGES,
+                        default=list(STAGES),
+                        help='the stages to run, loading what earlier stages '
+                        'saved for the ones not run (default: all)')
+    parser.add_argument('--dept', nargs='+', default=[],
+                        help='only crawl and export these departments, given '
+                        'by name (mathematics) or code (MATH)')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='export worker processes (default: one per CPU)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='pages fetched at once by the crawl (default: '
+                        'MAX_WORKERS in amherstgraph/web.py)')
+    parser.add_argument('--full', action='store_true',
+                        help='redo every step rather than only those whose '
+                        'inputs changed')
+    parser.add_argument('--offline', action='store_true',
+                        help='read every page from the response cache')
+    parser.add_argument('--profile', choices=('cprofile', 'pyinstrument'),
+                        help='profile the run')
+    args = parser.parse_args(argv)
+    try:
+        args.dept = get_dept_strings(args.dept)
+    except ValueError as error:
+        parser.error(str(error))
+    args.stages = [stage for stage in STAGES if stage in args.stages]
+    return args
+
+
+def main(argv=None):
+    "runs the pipeline as the command line asks, writing the run report"
+    from . import report
+    args = parse_args(argv)
+    from . import web
+    if args.offline:
+        web.OFFLINE = True
+    if args.workers is not None:
+        web.MAX_WORKERS = args.workers
+    report.reset_run_report()
+    profiler = report.start_profiler(args.profile or report.PROFILE)
+    try:
+        errors = run_pipeline(args.stages, args.dept, args.jobs,
+                              incremental=False if args.full else None)
+    finally:
+        report.stop_profiler(profiler)
+        report.write_run_report(settings={"stages": args.stages,
+                                          "departments": args.dept,
+                                          "jobs": args.jobs,
+                                          "workers": web.MAX_WORKERS,
+                                          "full": args.full,
+                                          "offline": args.offline})
+    for dept_string, error in errors.items():
+        print(dept_string + ' failed:\n' + error)
+    print(""" That's all folks! """)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
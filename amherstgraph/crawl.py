@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Crawling the department catalogs: the urls of the catalogs of the last four
+semesters, the courses each lists, and the courses related to each major.
+"""
+
+import io
+import itertools
+from datetime import date
+
+from lxml import html
+
+from .journal import get_finished_pages, record_page
+from .report import add_counts, instrumented
+from .web import fetch, fetch_all
+
+@instrumented
+def get_catalog_urls():
+    """
+    This function returns a list of departments' current course catalog URLs
+    as current_catalog_urls, a list
+    """
+    # define address strings
+    departments_url = "https://www.amherst.edu/academiclife/departments"
+    majors_xpath = '//*[@id="node-214534"]/div/div[1]/div/div/ul/li/a/@href'
+    
+    # get the page info
+    data = fetch(departments_url)
+    tree = html.parse(io.BytesIO(data))
+    
+    #get the urls of each major's course catalog
+    majors_urls = tree.xpath(majors_xpath)
+    current_catalog_urls = []
+    for dept in majors_urls:
+        current_catalog_urls.append("www.amherst.edu{}/courses".format(dept))
+        
+    # add architecture, which has a bad shortened url
+    url = 'www.amherst.edu/academiclife/departments/architectural_studies/'
+    url += 'courses'
+    current_catalog_urls.append(url)
+    
+    return current_catalog_urls
+
+
+@instrumented
+def get_date(current_catalog_urls):
+    """
+    This gets the current year, uses it to name the previous academic year,
+    and then creates a list of all the urls of course catalogs of each
+    department for each semester in the current and past academic years.
+    The automatic year-generation block may be replaceable with manual input,
+    in case the user wishes to research a particular set of years.
+    Returns catalog_urls, a list of department catalog urls for the last
+    4 semesters
+    """
+    if date.today().month < 5:
+        # it is in the spring
+        year3 = date.today().year - 2000 # the current 2-digit year
+        year2 = year3 - 1
+        year1 = year2 -1
+    else:
+        # it is in the fall
+        year2 = date.today().year - 2000 # the current 2-digit year
+        year1 = year2 - 1 # the past year
+        year3 = year2 + 1 # the year to come
+    year1, year2, year3 = str(year1), str(year2), str(year3)
+
+    # makes the url suffixes
+    years_of_interest_0 = ['/' + year1+year2, '/' + year2+year3]
+    years_of_interest = []
+    for year in years_of_interest_0:
+        years_of_interest .append(year + 'F')
+        years_of_interest .append(year + 'S')
+    
+    # makes catalog_urls, the list of all the department catalog URLs of
+    # interest
+    catalog_urls = []
+    for i in current_catalog_urls:
+        for j in years_of_interest:
+            catalog_urls.append(i + j)
+    return catalog_urls
+
+
+@instrumented
+def get_catalog_pages(catalog_urls, max_workers=None, journal=None):
+    """
+    This function fetches every department catalog page together with its
+    curriculum page, concurrently (max_workers at a time, MAX_WORKERS if
+    None), and returns a dictionary, catalog_pages, mapping each of their
+    urls to the page data (or to the exception raised fetching it) for
+    get_courses and get_related_courses to read.  Pages the journal, if one
+    is given, has already finished are not fetched.
+    """
+    catalogs = get_finished_pages(journal, 'catalog')
+    curricula = get_finished_pages(journal, 'curriculum')
+    urls = [url for url in catalog_urls if url not in catalogs]
+    urls += [url + '?display=curriculum' for url in catalog_urls
+             if url + '?display=curriculum' not in curricula]
+    return dict(fetch_all(urls, max_workers))
+
+
+def iter_pages(urls, pages, max_workers):
+    """
+    yields (url, data) for each of urls, taking the data from the dictionary
+    pages if one is given and fetching it concurrently otherwise
+    """
+    if pages is None:
+        return fetch_all(urls, max_workers)
+    return ((url, pages[url]) for url in urls)
+
+
+def record_failure(journal, kind, url, error):
+    """
+    reports a page which could not be read: prints its url, counts it in the
+    stage reading it and records it in the journal if one is given
+    """
+    print(url + '!')
+    add_counts(pages_failed=1)
+    if journal is not None:
+        record_page(journal, kind, url, error=error)
+
+
+@instrumented
+def get_courses(catalog_urls, max_workers=None, catalog_pages=None,
+                journal=None):
+    """
+    This function returns a dictionary, course_urls, mapping departments
+    to the urls of the courses they include.  The catalog pages are taken
+    from catalog_pages if given, or else fetched concurrently, max_workers at
+    a time (MAX_WORKERS if None), but are read in the order given.  Given a
+    journal, the catalogs it has finished are not read again, and each
+    catalog read, or which fails to be, is recorded in it; a catalog which
+    fails is left out.
+    """
+    # define the xpath address, dict to hold the results
+    path = '//*[@id="academics-course-list"]/' + \
+        'div[contains(@class, "coursehead")]/a/@href'
+    course_urls = {}
+    listed_urls = get_finished_pages(journal, 'catalog')
+    add_counts(pages_resumed=sum(url in listed_urls for url in catalog_urls))
+    unread_urls = [url for url in catalog_urls if url not in listed_urls]
+
+    # get all courses' urls from each major's catalog
+    for url, request in iter_pages(unread_urls, catalog_pages, max_workers):
+        try:
+            if isinstance(request, Exception):
+                raise request
+            tree = html.parse(io.BytesIO(request))
+            listed_urls[url] = ['www.amherst.edu' + x
+                                for x in tree.xpath(path)]
+        except Exception as error:
+            if journal is None and not isinstance(error, KeyError):
+                raise
+            record_failure(journal, 'catalog', url, error)
+        else:
+            if journal is not None:
+                record_page(journal, 'catalog', url, listed_urls[url])
+
+    # record their origins, in the order of the catalogs
+    for url in catalog_urls:
+        if url in listed_urls:
+            dept = url.split('/')[3]
+            if dept not in course_urls.keys():
+                course_urls[dept] = []
+            course_urls[dept] += listed_urls[url]
+    return course_urls
+
+@instrumented
+def get_related_courses(catalog_urls, max_workers=None,
+                        catalog_pages=None, journal=None):
+    """
+    Reads the curriculum page of each department catalog url, then returns
+    a dictionary, related_courses, mapping each department to a list of the
+    course codes related to the major.  The pages are taken from
+    catalog_pages if given, or else fetched concurrently, max_workers at a
+    time (MAX_WORKERS if None).  Given a journal, the pages it has finished
+    are not read again, and each page read, or which fails to be, is
+    recorded in it.
+    """
+    x1 = '//*[@id="acad-rltd-crs"]/div/text()'
+    x2 = '//*[@id="acad-rltd-crs"]/div/a/text()'
+    related_courses = {}
+    curriculum_urls = [url + '?display=curriculum' for url in catalog_urls]
+    related_codes = get_finished_pages(journal, 'curriculum')
+    add_counts(pages_resumed=sum(url in related_codes
+                                 for url in curriculum_urls))
+    unread_urls = [url for url in curriculum_urls if url not in related_codes]
+    for url, data in iter_pages(unread_urls, catalog_pages, max_workers):
+        try:
+            if isinstance(data, Exception):
+                raise data
+            tree = html.parse(io.BytesIO(data))
+            titles = tree.xpath(x1) + tree.xpath(x2)
+            related_codes[url] = [title[0:8] for title in titles]
+        except Exception as error:
+            record_failure(journal, 'curriculum', url, error)
+        else:
+            if journal is not None:
+                record_page(journal, 'curriculum', url, related_codes[url])
+    for url in curriculum_urls:
+        dept = url.split('/')[3]
+        if dept not in related_courses.keys():
+            related_courses[dept] = set()
+        related_courses[dept].update(related_codes.get(url, []))
+    return {dept: sorted(codes) for dept, codes in related_courses.items()}
+
+
+@instrumented
+def add_related_departments(course_details, related_courses):
+    """
+    stores, under the key "related_departments" of each course record in
+    course_details, the sorted list of departments which name the course as
+    related to their major on their curriculum pages
+    """
+    related_departments = {}
+    for dept, codes in sorted(related_courses.items()):
+        for code in codes:
+            if code in course_details.keys():
+                if code not in related_departments:
+                    related_departments[code] = []
+                related_departments[code].append(dept)
+    for code, record in course_details.items():
+        record["related_departments"] = related_departments.get(code, [])
+
+
+def get_course_code(url):
+    "returns the course code, e.g. 'MATH-111', at the end of a course url"
+    return '-'.join(url.split('/')[::-1][0].split('-')[0:2])
+
+
+def get_semester_key(url):
+    """
+    returns a sortable key, (year, is_spring), for the semester at the end
+    of a course url like '.../MATH-111-1516S'.  Both semesters of an
+    academic year take the year it ends in, and spring sorts after fall.
+    """
+    return (int(url[len(url) - 3:len(url) - 1]), url[len(url) - 1:] == 'S')
+
+
+@instrumented
+def get_most_recent_course_urls(course_urls):
+    """
+    This function returns a list of the urls of the most recent iterations of
+    all the courses observed
+    """
+    # make a unique list of all the course urls
+    unique_course_urls = set(itertools.chain(*course_urls.values()))
+
+    # index the (semester, url) offerings of each course code
+    offerings = {}
+    for url in unique_course_urls:
+        code = get_course_code(url)
+        if code not in offerings:
+            offerings[code] = []
+        offerings[code].append((get_semester_key(url), url))
+
+    # make a list of all the most recent course urls
+    unique_recent_urls = []
+    for code in sorted(offerings.keys()):
+        latest = max(offerings[code])[0]
+        unique_recent_urls += sorted(url for key, url in offerings[code]
+                                     if key == latest)
+    return unique_recent_urls
+
+
+def get_url_departments(course_urls):
+    """
+    This function inverts course_urls, returning a dictionary mapping each
+    course url to the list of departments whose catalogs include it, in the
+    order of course_urls
+    """
+    url_departments = {}
+    for dept, urls in course_urls.items():
+        for url in urls:
+            if url not in url_departments:
+                url_departments[url] = []
+            if dept not in url_departments[url]:
+                url_departments[url].append(dept)
+    return url_departments
@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""
+The course database: a SQLite file keeping every offering the catalogs have
+listed, the departments listing each, the courses related to each major,
+the most recent record read of each course and the prerequisites extracted
+from it.  The catalog, courses and prereqs stages write to it as they run,
+changing only the rows whose data changed, and the export stage builds the
+prerequisite graph from it.  Offerings are kept when they fall out of the
+four semesters crawled, so the database holds the history of every build
+and answers questions about it, e.g. get_department_courses, without
+crawling.
+"""
+
+import json
+import sqlite3
+from collections import OrderedDict
+
+from .crawl import get_course_code
+from .departments import DEPT_CODES
+from .incremental import PREREQ_FORMAT, add_fingerprints
+from .records import CourseRecord
+from .report import instrumented
+
+# the course database, kept between builds like the response cache
+DATABASE_PATH = './course_history.sqlite'
+
+# Offerings are course urls, e.g. '.../courses/1516S/MATH/MATH-365-1516S',
+# with the semester they end in split into the academic year it ends in
+# (2016), whether it is the spring term and the calendar year it is taught
+# in (2016; 2015 for '1516F').  term, twice the academic year plus one in
+# the spring, sorts the semesters.  A course record is that of the page read
+# by the last courses stage; prereqs_read is the PREREQ_FORMAT in which its
+# prerequisites were extracted from its current requisite line, cleared when
+# the line changes.  A prerequisite's group_id numbers the groups of
+# alternatives of its course (NULL unless its kind is 'or'), and is added to
+# the prereqs table of a database made before it was recorded.  Listings
+# are read back in the order they were first
+# written (their rowid), the order the catalogs gave; the departments a
+# course is related to are read back sorted, so that an unchanged catalog
+# gives unchanged course records (and fingerprints).
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS departments (
+    dept_string TEXT PRIMARY KEY,
+    code TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS departments_code ON departments (code);
+
+CREATE TABLE IF NOT EXISTS offerings (
+    url TEXT PRIMARY KEY,
+    code TEXT NOT NULL,
+    semester TEXT NOT NULL,
+    academic_year INTEGER NOT NULL,
+    is_spring INTEGER NOT NULL,
+    calendar_year INTEGER NOT NULL,
+    term INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS offerings_code_term ON offerings (code, term);
+CREATE INDEX IF NOT EXISTS offerings_semester ON offerings (semester);
+CREATE INDEX IF NOT EXISTS offerings_calendar_year
+    ON offerings (calendar_year);
+
+CREATE TABLE IF NOT EXISTS listings (
+    dept_string TEXT NOT NULL,
+    url TEXT NOT NULL,
+    PRIMARY KEY (dept_string, url)
+);
+CREATE INDEX IF NOT EXISTS listings_url ON listings (url);
+
+CREATE TABLE IF NOT EXISTS related (
+    dept_string TEXT NOT NULL,
+    code TEXT NOT NULL,
+    PRIMARY KEY (dept_string, code)
+);
+
+CREATE TABLE IF NOT EXISTS courses (
+    code TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    rline TEXT NOT NULL,
+    prereqs_read TEXT
+);
+
+CREATE TABLE IF NOT EXISTS prereqs (
+    course TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    prereq TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    group_id INTEGER,
+    PRIMARY KEY (course, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS prereqs_prereq ON prereqs (prereq);
+"""
+
+
+def connect_database(path=None):
+    """
+    returns a connection to the course database at path (DATABASE_PATH if
+    None), creating its tables and filling in the departments if they are
+    missing
+    """
+    if path is None:
+        path = DATABASE_PATH
+    connection = sqlite3.connect(path)
+    connection.execute('PRAGMA journal_mode = WAL')
+    connection.execute('PRAGMA synchronous = NORMAL')
+    with connection:
+        connection.executescript(SCHEMA)
+        columns = [row[1] for row
+                   in connection.execute('PRAGMA table_info(prereqs)')]
+        if 'group_id' not in columns:
+            connection.execute('ALTER TABLE prereqs ADD COLUMN group_id '
+                               'INTEGER')
+        connection.executemany(
+            'INSERT OR REPLACE INTO departments (dept_string, code) '
+            'VALUES (?, ?)', DEPT_CODES.items())
+    return connection
+
+
+def get_offering(url):
+    """
+    returns the row of the offerings table for a course url, e.g.
+    '.../MATH-365-1516S'
+    """
+    semester = url[len(url) - 5:]
+    academic_year = 2000 + int(semester[2:4])
+    is_spring = semester[4] == 'S'
+    return (url, get_course_code(url), semester, academic_year,
+            int(is_spring), academic_year if is_spring else academic_year - 1,
+            2 * academic_year + is_spring)
+
+
+def get_catalog_semesters(catalog_urls):
+    """
+    returns the sorted semesters, e.g. '1516S', of a list of department
+    catalog urls
+    """
+    return sorted(set(url.rsplit('/', 1)[1] for url in catalog_urls))
+
+
+def get_placeholders(values):
+    "returns the '?, ?, ...' placeholders of a sequence of sql parameters"
+    return ', '.join('?' * len(values))
+
+
+@instrumented
+def write_catalog(connection, catalog_urls, course_urls, related_courses):
+    """
+    records what the catalog stage found in the catalogs at catalog_urls:
+    the course urls listed by each department and the courses related to
+    each major.  Offerings are only ever added; the listings of a crawled
+    catalog which it no longer lists, and the related courses of a crawled
+    department in related_courses which it no longer relates, are deleted,
+    and only the listings and related courses not yet recorded are added.
+    """
+    crawled = set((url.split('/')[3], url.rsplit('/', 1)[1])
+                  for url in catalog_urls)
+    with connection:
+        connection.executemany(
+            'INSERT OR IGNORE INTO offerings VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (get_offering(url) for url in
+             set(url for urls in course_urls.values() for url in urls)))
+        connection.execute('CREATE TEMP TABLE IF NOT EXISTS crawled_catalogs '
+                           '(dept_string TEXT, semester TEXT, '
+                           'PRIMARY KEY (dept_string, semester))')
+        connection.execute('CREATE TEMP TABLE IF NOT EXISTS crawled_listings '
+                           '(dept_string TEXT, url TEXT, '
+                           'UNIQUE (dept_string, url))')
+        connection.execute('DELETE FROM crawled_catalogs')
+        connection.execute('DELETE FROM crawled_listings')
+        connection.executemany('INSERT INTO crawled_catalogs VALUES (?, ?)',
+                               crawled)
+        connection.executemany(
+            'INSERT OR IGNORE INTO crawled_listings VALUES (?, ?)',
+            ((dept_string, url) for dept_string, urls in course_urls.items()
+             for url in urls if (dept_string, url[len(url) - 5:]) in crawled))
+        connection.execute(
+            'DELETE FROM listings WHERE rowid IN (SELECT l.rowid '
+            'FROM crawled_catalogs c '
+            'JOIN listings l ON l.dept_string = c.dept_string '
+            'JOIN offerings o ON o.url = l.url AND o.semester = c.semester '
+            'WHERE NOT EXISTS (SELECT 1 FROM crawled_listings n '
+            'WHERE n.dept_string = l.dept_string AND n.url = l.url))')
+        connection.execute(
+            'INSERT OR IGNORE INTO listings (dept_string, url) '
+            'SELECT dept_string, url FROM crawled_listings ORDER BY rowid')
+        for dept_string in sorted(set(dept for dept, semester in crawled).
+                                  intersection(related_courses)):
+            recorded = set(code for code, in connection.execute(
+                'SELECT code FROM related WHERE dept_string = ?',
+                (dept_string,)))
+            codes = set(related_courses[dept_string])
+            connection.executemany(
+                'DELETE FROM related WHERE dept_string = ? AND code = ?',
+                ((dept_string, code) for code in sorted(recorded - codes)))
+            connection.executemany(
+                'INSERT INTO related (dept_string, code) VALUES (?, ?)',
+                ((dept_string, code) for code in sorted(codes - recorded)))
+
+
+@instrumented
+def write_courses(connection, course_details):
+    """
+    records the course records of course_details, marking the prerequisites
+    of those whose requisite line changed as unread
+    """
+    with connection:
+        connection.executemany(
+            'INSERT INTO courses (code, url, title, description, rline) '
+            'VALUES (?, ?, ?, ?, ?) ON CONFLICT (code) DO UPDATE SET '
+            'url = excluded.url, title = excluded.title, '
+            'description = excluded.description, rline = excluded.rline, '
+            'prereqs_read = CASE WHEN rline = excluded.rline '
+            'THEN prereqs_read END WHERE url != excluded.url OR '
+            'title != excluded.title OR description != excluded.description '
+            'OR rline != excluded.rline',
+            ((code, record["url"], record["title"], record["description"],
+              json.dumps(record["rline"]))
+             for code, record in course_details.items()))
+
+
+@instrumented
+def write_prereqs(connection, codes, prereqs):
+    """
+    records prereqs, a list of (prerequisite, course, kind, group) tuples,
+    as the prerequisites of the courses whose codes are listed, only
+    changing the rows which differ from those recorded
+    """
+    positions = {}
+    rows = set()
+    for prereq, course, kind, group in prereqs:
+        position = positions.get(course, 0)
+        positions[course] = position + 1
+        rows.add((course, position, prereq, kind, group))
+    codes = list(codes)
+    with connection:
+        connection.execute('CREATE TEMP TABLE IF NOT EXISTS written_codes '
+                           '(code TEXT PRIMARY KEY)')
+        connection.execute('DELETE FROM written_codes')
+        connection.executemany('INSERT OR IGNORE INTO written_codes '
+                               'VALUES (?)', ((code,) for code in codes))
+        recorded = set(connection.execute(
+            'SELECT course, position, prereq, kind, group_id FROM prereqs '
+            'WHERE course IN (SELECT code FROM written_codes)'))
+        connection.executemany(
+            'DELETE FROM prereqs WHERE course = ? AND position = ?',
+            ((course, position) for course, position, prereq, kind, group
+             in recorded - rows))
+        connection.executemany(
+            'INSERT OR REPLACE INTO prereqs VALUES (?, ?, ?, ?, ?)',
+            rows - recorded)
+        connection.execute(
+            'UPDATE courses SET prereqs_read = ? '
+            'WHERE code IN (SELECT code FROM written_codes)',
+            (PREREQ_FORMAT,))
+
+
+@instrumented
+def load_course_details(connection, semesters):
+    """
+    returns course_details, as the courses stage makes it, of every recorded
+    course which a department lists in one of the semesters, ordered by code
+    """
+    semesters = list(semesters)
+    rows = connection.execute(
+        'SELECT code, url, title, description, rline FROM courses WHERE code '
+        'IN (SELECT o.code FROM offerings o JOIN listings l ON l.url = o.url '
+        'WHERE o.semester IN ({})) ORDER BY code'.format(
+            get_placeholders(semesters)), semesters).fetchall()
+    url_departments = {}
+    for url, dept_string in connection.execute(
+            'SELECT url, dept_string FROM listings ORDER BY rowid'):
+        url_departments.setdefault(url, []).append(dept_string)
+    related_departments = {}
+    for dept_string, code in connection.execute(
+            'SELECT dept_string, code FROM related '
+            'ORDER BY dept_string, rowid'):
+        related_departments.setdefault(code, []).append(dept_string)
+
+    course_details = OrderedDict()
+    for code, url, title, description, rline in rows:
+        course_details[code] = CourseRecord(
+            url, url_departments.get(url.split('://', 1)[-1], ()),
+            description, json.loads(rline), title,
+            related_departments.get(code, ()))
+    add_fingerprints(course_details)
+    return course_details
+
+
+@instrumented
+def load_prereqs(connection, codes):
+    """
+    returns the recorded prerequisites of the courses whose codes are
+    listed, as (prerequisite, course, kind, group) tuples in the order of
+    codes; raises a LookupError if those of any of the courses were not
+    extracted from its current requisite line
+    """
+    connection.execute('CREATE TEMP TABLE IF NOT EXISTS loaded_codes '
+                       '(code TEXT PRIMARY KEY, position INTEGER)')
+    with connection:
+        connection.execute('DELETE FROM loaded_codes')
+        connection.executemany('INSERT OR IGNORE INTO loaded_codes '
+                               'VALUES (?, ?)',
+                               ((code, i) for i, code in enumerate(codes)))
+    unread = connection.execute(
+        'SELECT COUNT(*) FROM courses WHERE code IN '
+        '(SELECT code FROM loaded_codes) AND prereqs_read IS NOT ?',
+        (PREREQ_FORMAT,)).fetchone()[0]
+    if unread:
+        raise LookupError('the prerequisites of {} courses are not in the '
+                          'course database: run the prereqs stage first'.
+                          format(unread))
+    return connection.execute(
+        'SELECT p.prereq, p.course, p.kind, p.group_id FROM prereqs p '
+        'JOIN loaded_codes c ON c.code = p.course '
+        'ORDER BY c.position, p.position').fetchall()
+
+
+def get_latest_offerings(connection):
+    """
+    returns a dictionary mapping every recorded course code to the url of its
+    latest offering (the last in url order if it had several that semester)
+    """
+    return dict(connection.execute(
+        'SELECT o.code, MAX(o.url) FROM offerings o JOIN '
+        '(SELECT code, MAX(term) AS term FROM offerings GROUP BY code) l '
+        'ON o.code = l.code AND o.term = l.term GROUP BY o.code'))
+
+
+def get_department_courses(connection, dept, first_year=None,
+                           last_year=None):
+    """
+    returns the sorted codes of the courses a department, given by its
+    department string or code, listed in the calendar years from first_year
+    to last_year (each unbounded if None), e.g.
+    get_department_courses(connection, 'MATH', 2015, 2017)
+    """
+    return [code for code, in connection.execute(
+        'SELECT DISTINCT o.code FROM departments d '
+        'JOIN listings l ON l.dept_string = d.dept_string '
+        'JOIN offerings o ON o.url = l.url '
+        'WHERE (d.dept_string = ? OR d.code = ?) '
+        'AND o.calendar_year BETWEEN ? AND ? ORDER BY o.code',
+        (dept, dept, first_year if first_year is not None else 0,
+         last_year if last_year is not None else 9999))]
+
+
+def get_course_history(connection, code):
+    """
+    returns the offerings of a course, oldest first, as (semester, url,
+    departments listing it) tuples
+    """
+    history = []
+    for semester, url in connection.execute(
+            'SELECT semester, url FROM offerings WHERE code = ? '
+            'ORDER BY term, url', (code,)).fetchall():
+        departments = [dept_string for dept_string, in connection.execute(
+            'SELECT dept_string FROM listings WHERE url = ? ORDER BY rowid',
+            (url,))]
+        history.append((semester, url, departments))
+    return history
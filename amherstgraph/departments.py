@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+The departments whose prerequisite networks are exported, and the codes of
+every department a course can belong to.
+"""
+
+#This chunk creates a dictionary mapping the long-form deparment names
+#found in their departmental catalog urls and so in the course_urls
+#dictionary to the four-digit departmental codes used elsewhere
+
+DEPT_CODES = {'Biology':                         'BIOL',
+              'american_studies':                'AMST',
+              'anthropology_sociology':          'ANTH', # or SOCI
+              'architectural_studies':           'ARCH',
+              'art':                             'ARHA',
+              'asian':                           'ASLC',
+              'astronomy':                       'PHYS',
+              'biochemistry-biophysics':         'BCBP',
+              'black_studies':                   'BLST',
+              'chemistry':                       'CHEM',
+              'classics':                        'CLAS',
+              'computer_science':                'COSC',
+              'economics':                       'ECON',
+              'english':                         'ENGL',
+              'environmental_studies':           'ENST',
+              'european_studies':                'HIST',
+              'film':                            'FILM',
+              'french':                          'FREN',
+              'geology':                         'GEOL',
+              'german':                          'GERM',
+              'history':                         'HIST',
+              'ljst':                            'LJST',
+              'mathematics':                     'MATH',
+              'music':                           'MUSI',
+              'neuroscience':                    'NEUR',
+              'philosophy':                      'PHIL',
+              'physics':                         'PHYS',
+              'political_science':               'POSC',
+              'psychology':                      'PSYC',
+              'religion':                        'RELI',
+              'russian':                         'RUSS',
+              'sexuality_womens_gender_studies': 'SWAG',
+              'spanish':                         'SPAN',
+              'theater_dance':                   'THDA'}
+
+DEPTS = ['GEOL', 'AMST', 'PSYC', 'FREN', 'FILM', 'STAT',
+         'CHEM', 'MUSI', 'FAMS', 'ANTH', 'HIST', 'POSC',
+         'SOCI', 'ARCH', 'ARAB', 'BIOL', 'GREE', 'EUST',
+         'PHYS', 'BCBP', 'SWAG', 'NEUR', 'CLAS', 'SPAN',
+         'COSC', 'BLST', 'ENST', 'GERM', 'PHIL', 'LATI',
+         'ENGL', 'ARHA', 'CHIN', 'LJST', 'MATH', 'ASTR',
+         'THDA', 'RUSS', 'RELI', 'ECON', 'JAPA', 'ASLC']
+DEPT_SET = frozenset(DEPTS)
+
+
+def get_dept_strings(names):
+    """
+    returns the department strings named by department strings or codes,
+    e.g. 'mathematics' or 'MATH', or None if names is empty; raises a
+    ValueError naming any it does not know
+    """
+    if not names:
+        return None
+    dept_strings = []
+    for name in names:
+        matches = [dept_string for dept_string, code in DEPT_CODES.items()
+                   if name in (dept_string, code)]
+        if not matches:
+            raise ValueError('unknown department: ' + name)
+        dept_strings += [match for match in matches
+                         if match not in dept_strings]
+    return dept_strings
+
+## how I obtained these lists:
+#dept_codes = {}
+#for k in course_urls.keys():
+#    dept_codes[k] = max(set([u.split('/')[5] for u in course_urls[k]]),
+#                         key=[u.split('/')[5] for u in course_urls[k]].count)
+#    print(k)
+#    print([u.split('/')[5] for u in course_urls[k]])
+#    print(max(set([u.split('/')[5] for u in course_urls[k]]),
+#                  key=[u.split('/')[5] for u in course_urls[k]].count))
+#dept_codes['classics'] = 'CLAS'
+#dept_codes['asian'] = 'ASLC'
+#dept_codes['film'] = 'FILM'
+#dept_codes['biochemistry-biophysics'] = dept_codes['courses']
+#dept_codes['biochemistry-biophysics'] = 'BCBP'
+#
+#for k in course_urls.keys():
+#    for url in course_urls[k]:
+#        dept_code = url.split('/')[5]
+#        depts.append(dept_code)
+#depts = list(set(depts))
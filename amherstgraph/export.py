@@ -0,0 +1,460 @@
+# -*- coding: utf-8 -*-
+"""
+Exporting each department's prerequisite network as the data.json read by
+the network viewer, with the shared course store, the search index,
+compressed sidecars and parallel export of departments.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import traceback
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from . import search
+from .files import write_atomically
+from .graph import make_subgraph
+from .layout import get_layout
+from .reachability import get_subgraph_ancestors
+from .report import RUN_REPORT, add_counts, instrumented
+
+def make_color(dept_code, channel):
+    """
+    returns a number between 0 and 255, always the same for a given
+    department code and channel (0, 1 or 2)
+    """
+    return hashlib.md5(dept_code.encode('utf-8')).digest()[channel]
+
+
+def get_rgb(dept_code):
+    """
+    returns a tuple of three numbers between 0 and 255, the color of a
+    department code in every export
+    """
+    return (make_color(dept_code, 0), make_color(dept_code, 1),
+            make_color(dept_code, 2))
+
+
+def make_json_nodes(subgraph, course_details, sugiyama_layout,
+                    department_colors, ancestors=None):
+    """
+    yields the node json objects of a department's data json object, one for
+    each course in its subgraph, listing the ids of the nodes each requires
+    at any remove under "ancestors" if the subgraph's ancestors are given
+    """
+    for node in enumerate(subgraph.vs["name"]):
+        if node[1] in course_details.keys():
+            node_output = OrderedDict()
+            node_output["label"] = node[1]
+            node_output["x"] = sugiyama_layout[node[0]][0]
+            node_output["y"] = sugiyama_layout[node[0]][1]
+            node_output["id"] = str(node[0])
+            node_output["attributes"] = OrderedDict()
+            node_output["attributes"]["Title"] = course_details[\
+                node[1]]["title"]
+            node_output["attributes"]["Description"] = \
+                course_details[node[1]]["description"]
+            node_output["attributes"]["Department Code"] = node[1][0:4]
+            node_output["attributes"]["Course Site"] = "<a href= '" + \
+                course_details[node[1]]["url"] + "'> Course Site </a>"
+            node_output["attributes"]["Requisite"] = \
+                course_details[node[1]]["rline"]
+            node_output["color"] = 'rgb' + str(department_colors[node[1][0:4]])
+            node_output["size"] = 10.0 
+        # if the course has no retrieved details:
+        else:
+            node_output = OrderedDict()
+            node_output["label"] = node[1]
+            node_output["x"] = sugiyama_layout[node[0]][0]
+            node_output["y"] = sugiyama_layout[node[0]][1]
+            node_output["id"] = str(node[0])
+            node_output["attributes"] = OrderedDict()
+            node_output["attributes"]["Title"] = node[1]
+            node_output["attributes"]["Description"] = 'not offered in the' + \
+                " last 4 semesters"
+            node_output["attributes"]["Department Code"] = node[1][0:4]
+            node_output["attributes"]["Course Site"] = ""
+            node_output["attributes"]["Requisite"] = ''
+            node_output["color"] = 'rgb' + str(department_colors[node[1][0:4]])
+            node_output["size"] = 10.0
+        if ancestors is not None:
+            node_output["ancestors"] = [str(ancestor) for ancestor
+                                        in ancestors[node[0]]]
+        yield node_output
+
+
+def make_json_edges(subgraph, department_colors):
+    """
+    yields the edge json objects of a department's data json object, one for
+    each prerequisite in its subgraph, with the "group" of alternatives of
+    its course it is in if it is one of several alternatives
+    """
+    edgelist = subgraph.get_edgelist()
+    groups = subgraph.es["group"] if "group" in subgraph.es.attributes() \
+        else [None] * len(edgelist)
+    for edge in enumerate(edgelist):
+        color = department_colors[subgraph.vs["name"][edge[1][1]][0:4]]
+        color = 'rgb' + str(color)
+        edge_output = OrderedDict()
+        edge_output["label"] = ''
+        edge_output["source"] = str(edge[1][0])
+        edge_output["target"] = str(edge[1][1])
+        edge_output["id"] = str(6 + 2*edge[0])
+        # this is to conform with the odd indexing I see in working 
+        # visualisations: one less than the number of keys of a node, plus
+        # twice the index of the edge
+        edge_output["attributes"] = {}
+        edge_output["color"] = color # target node color
+        edge_output["size"] = 1.0
+        if groups[edge[0]] is not None:
+            edge_output["group"] = groups[edge[0]]
+        yield edge_output
+
+
+def make_json_parts(dept_string, course_details, complete_course_graph,
+                    subgraph=None):
+    """
+    returns a tuple of generators (nodes, edges) of the node and edge json
+    objects of a department's data json object, laying out its subgraph
+    first, with the chains of prerequisites of its nodes if the graph has a
+    reachability index.  A subgraph already made for the department may be
+    passed in to save remaking it.
+    """
+    #get the subgraph, node positions
+    if subgraph is None:
+        subgraph = make_subgraph(dept_string, \
+                                 course_details, \
+                                 complete_course_graph)
+    sugiyama_layout = get_layout(subgraph, complete_course_graph)
+
+    unique_departments = [name[0:4] for name in subgraph.vs["name"]]
+    department_colors = {dept:get_rgb(dept) for dept in unique_departments}
+    ancestors = None
+    if "reachability" in complete_course_graph.attributes():
+        ancestors = get_subgraph_ancestors(
+            subgraph, complete_course_graph["reachability"])
+
+    return (make_json_nodes(subgraph, course_details, sugiyama_layout,
+                            department_colors, ancestors),
+            make_json_edges(subgraph, department_colors))
+
+
+def make_json(dept_string, course_details, complete_course_graph,
+              subgraph=None):
+    """
+    This function makes a JSON object called 'data', to be inserted
+    into the directory exported by a sigma.js template (named 'network') to
+    make an interactive web visualization of the prereqs network.  A
+    subgraph already made for the department may be passed in to save
+    remaking it.
+    """
+    nodes, edges = make_json_parts(dept_string, course_details,
+                                   complete_course_graph, subgraph)
+    data = {"edges":list(edges), "nodes":list(nodes)}
+    return data
+
+
+def find_or_make_directory_address(dept_string):
+    """
+    finds whether there is a directory named after a deptarment string, and
+    if not, makes one
+    """
+    directory = './'+ dept_string
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    return directory
+
+
+# with SHARED_STORE set, the attributes of each course (title, description,
+# site, requisites) are written once to STORE_DIR, named by a hash of their
+# content, and each department's data.json holds only the name of each of its
+# courses' attributes, which the viewer fetches when a course is selected
+STORE_DIR = './course_store'
+SHARED_STORE = True
+
+
+def store_attributes(attributes):
+    """
+    writes a node's attributes to the shared course store under a name
+    hashed from their content, unless they are already there, and returns
+    the name
+    """
+    serialized = json.dumps(attributes, separators=(',', ':')).encode('utf-8')
+    name = hashlib.sha1(serialized).hexdigest()[0:16]
+    path = os.path.join(STORE_DIR, name + '.json')
+    if not os.path.exists(path):
+        write_atomically(path, serialized)
+    return name
+
+
+def move_attributes_to_store(node_output):
+    """
+    moves the attributes of a node json object to the shared course store,
+    leaving the name of its attributes in the node's "store", and returns
+    the node
+    """
+    node_output["store"] = store_attributes(node_output.pop("attributes"))
+    return node_output
+
+
+def drop_edge_attributes(edge_output):
+    "drops the empty label and attributes of an edge json object, returning it"
+    del edge_output["label"]
+    del edge_output["attributes"]
+    return edge_output
+
+
+@instrumented
+def prune_store(dept_strings):
+    """
+    deletes the attributes in the shared course store which no department's
+    data.json refers to
+    """
+    if not os.path.exists(STORE_DIR):
+        return
+    referenced = set()
+    for dept_string in dept_strings:
+        path = './' + dept_string + '/data.json'
+        if os.path.exists(path):
+            with open(path) as data_file:
+                nodes = json.load(data_file)["nodes"]
+            referenced.update(node.get("store") for node in nodes)
+    for file_name in os.listdir(STORE_DIR):
+        if file_name[:-len('.json')] not in referenced:
+            os.remove(os.path.join(STORE_DIR, file_name))
+
+
+# streaming export: data.json is written node by node and edge by edge,
+# encoded with orjson if it is installed, to a temporary file which is renamed
+# over the old one only when it is complete.  The same bytes are compressed
+# as they are written into the sidecars data.json.gz and (if brotli is
+# installed) data.json.br, which the shipped htaccess_example and web.config
+# serve to browsers that accept them.
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+
+def encode_json(json_object):
+    "returns a json object compactly encoded as utf-8 bytes"
+    if orjson is not None:
+        return orjson.dumps(json_object)
+    return json.dumps(json_object, separators=(',', ':')).encode('utf-8')
+
+
+def get_sidecar_compressors():
+    """
+    returns a dictionary mapping the extension of each compressed sidecar to
+    a tuple (compress, finish) of functions which compress a chunk and return
+    the rest of the compressed stream
+    """
+    # wbits=31 writes a gzip header (with no name or timestamp, so that
+    # unchanged data compresses to unchanged bytes)
+    gzip_compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    compressors = {'.gz': (gzip_compressor.compress, gzip_compressor.flush)}
+    if brotli is not None:
+        brotli_compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        compressors['.br'] = (brotli_compressor.process,
+                              brotli_compressor.finish)
+    return compressors
+
+
+def write_json_stream(path, sections):
+    """
+    writes a json object, given as a list of (key, items) tuples whose items
+    are iterated only as they are written, to path and its compressed
+    sidecars.  Every file is written beside its destination and renamed over
+    it only once all of them are complete, so a crash leaves the old files in
+    place; a sidecar whose compressor is no longer installed is deleted, so
+    that it cannot be served in place of newer data.  Returns a dictionary of
+    the number of items written under each key and the number of bytes
+    written to each file ('json_bytes', 'gz_bytes', 'br_bytes').
+    """
+    directory = os.path.dirname(path)
+    if not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    suffix = '.{}.{}.tmp'.format(os.getpid(), threading.get_ident())
+    compressors = get_sidecar_compressors()
+    targets = {'': open(path + suffix, 'wb')}
+    for extension in compressors:
+        targets[extension] = open(path + extension + suffix, 'wb')
+    counts = {'json_bytes': 0}
+
+    def write(chunk):
+        counts['json_bytes'] += targets[''].write(chunk)
+        for extension, (compress, finish) in compressors.items():
+            targets[extension].write(compress(chunk))
+
+    try:
+        write(b'{')
+        for section in enumerate(sections):
+            key, items = section[1]
+            if section[0] > 0:
+                write(b',')
+            write(encode_json(key) + b':[')
+            counts[key] = 0
+            for item in enumerate(items):
+                if item[0] > 0:
+                    write(b',')
+                write(encode_json(item[1]))
+                counts[key] += 1
+            write(b']')
+        write(b'}')
+        for extension, (compress, finish) in compressors.items():
+            targets[extension].write(finish())
+    except BaseException:
+        for extension, target_file in targets.items():
+            target_file.close()
+            os.remove(path + extension + suffix)
+        raise
+    for extension, target_file in targets.items():
+        if extension:
+            counts[extension[1:] + '_bytes'] = target_file.tell()
+        target_file.close()
+        os.replace(path + extension + suffix, path + extension)
+    if brotli is None and os.path.exists(path + '.br'):
+        os.remove(path + '.br')
+    return counts
+
+
+def export_json(dept_string, course_details, complete_course_graph,
+                subgraph=None):
+    """
+    writes the data json object describing a major's prerequisite network to
+    a file called 'data.json' in a directory named after the department,
+    with its courses' attributes in the shared course store if SHARED_STORE
+    is set, streaming its nodes and edges into the file and its compressed
+    sidecars, and its search index to 'search.json' beside it if
+    EXPORT_SEARCH_INDEX is set.  Returns the counts of write_json_stream
+    with the size of the search index ('search_bytes') and the time taken
+    to lay out the department and to export it altogether, and the name of
+    its cached layout ('layout_key') if it was laid out on its own.
+    """
+    time_0 = time.perf_counter()
+    if subgraph is None:
+        subgraph = make_subgraph(dept_string, course_details,
+                                 complete_course_graph)
+    nodes, edges = make_json_parts(dept_string, course_details,
+                                   complete_course_graph, subgraph)
+    layout_seconds = time.perf_counter() - time_0
+    if SHARED_STORE:
+        nodes = map(move_attributes_to_store, nodes)
+        edges = map(drop_edge_attributes, edges)
+    path = find_or_make_directory_address(dept_string)
+    path += '/data.json'
+    counts = write_json_stream(path, [("nodes", nodes), ("edges", edges)])
+    search_path = os.path.join(os.path.dirname(path), 'search.json')
+    if search.EXPORT_SEARCH_INDEX:
+        titles, words = search.make_search_index(subgraph.vs["name"],
+                                                 course_details)
+        counts["search_bytes"] = write_json_stream(
+            search_path, [("titles", titles), ("words", words)])["json_bytes"]
+    else:
+        # an index left from an earlier export would not match the new ids
+        for extension in ('', '.gz', '.br'):
+            if os.path.exists(search_path + extension):
+                os.remove(search_path + extension)
+    counts["layout_seconds"] = layout_seconds
+    if "layout_key" in subgraph.attributes():
+        counts["layout_key"] = subgraph["layout_key"]
+    counts["export_seconds"] = time.perf_counter() - time_0
+    return counts
+
+# parallel export: laying out and serializing a department is CPU-bound and
+# independent of the other departments, so export_departments spreads them
+# over EXPORT_JOBS worker processes, each of which receives course_details
+# and complete_course_graph once when it starts
+EXPORT_JOBS = os.cpu_count() or 1
+WORKER_STATE = {}
+
+
+def init_export_worker(course_details, complete_course_graph):
+    "stores the data shared by every export task in a worker process"
+    WORKER_STATE["course_details"] = course_details
+    WORKER_STATE["complete_course_graph"] = complete_course_graph
+
+
+def export_json_task(dept_string, subgraph):
+    """
+    exports one department in a worker process, returning the department
+    string, the traceback of its failure, or None if it succeeded, and the
+    counts of export_json, or None if it failed
+    """
+    try:
+        counts = export_json(dept_string, WORKER_STATE["course_details"],
+                             WORKER_STATE["complete_course_graph"], subgraph)
+        return dept_string, None, counts
+    except Exception:
+        return dept_string, traceback.format_exc(), None
+
+
+def record_department(dept_string, error, counts):
+    """
+    records the counts of a department's export in RUN_REPORT and adds them
+    to the export stage's, and prints whether it succeeded
+    """
+    if error is None:
+        RUN_REPORT["departments"][dept_string] = counts
+        add_counts(departments=1, **{key: counts[key] for key in counts
+                                     if key.endswith('_bytes')})
+        print(dept_string + ' done')
+    else:
+        RUN_REPORT["departments"][dept_string] = {"failed": True}
+        add_counts(departments_failed=1)
+
+
+@instrumented
+def export_departments(subgraphs, course_details, complete_course_graph,
+                       jobs=None, layout_keys=None):
+    """
+    exports data.json for every department in subgraphs, a dictionary
+    mapping department strings to their subgraphs, using jobs worker
+    processes (EXPORT_JOBS if None, or none, if jobs is 1).  A department
+    which fails does not stop the others; returns a dictionary mapping each
+    department which failed to its traceback.  If a dictionary layout_keys
+    is given, the name of the cached layout of each department exported is
+    stored in it.
+    """
+    if jobs is None:
+        jobs = EXPORT_JOBS
+    if layout_keys is None:
+        layout_keys = {}
+    errors = {}
+    if jobs == 1 or len(subgraphs) < 2:
+        init_export_worker(course_details, complete_course_graph)
+        results = (export_json_task(dept_string, subgraph)
+                   for dept_string, subgraph in subgraphs.items())
+        for dept_string, error, counts in results:
+            record_department(dept_string, error, counts)
+            if error is not None:
+                errors[dept_string] = error
+            elif "layout_key" in counts:
+                layout_keys[dept_string] = counts["layout_key"]
+        return errors
+
+    with ProcessPoolExecutor(max_workers=jobs,
+                             initializer=init_export_worker,
+                             initargs=(course_details,
+                                       complete_course_graph)) as executor:
+        futures = [executor.submit(export_json_task, dept_string, subgraph)
+                   for dept_string, subgraph in subgraphs.items()]
+        for future in as_completed(futures):
+            dept_string, error, counts = future.result()
+            record_department(dept_string, error, counts)
+            if error is not None:
+                errors[dept_string] = error
+            elif "layout_key" in counts:
+                layout_keys[dept_string] = counts["layout_key"]
+    return errors
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+Helpers for the files written by every stage of a build.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+def write_atomically(path, data):
+    """
+    writes bytes to a temporary file beside path, then renames it over path
+    so that readers never see a partly written file
+    """
+    directory = os.path.dirname(path)
+    if not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    temp_path = '{}.{}.{}.tmp'.format(path, os.getpid(),
+                                      threading.get_ident())
+    with open(temp_path, 'wb') as temp_file:
+        temp_file.write(data)
+    os.replace(temp_path, path)
+
+
+def get_fingerprint(obj):
+    """
+    returns a sha1 hex digest of any json-serializable object, independent
+    of the order of its dictionary keys
+    """
+    serialized = json.dumps(obj, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(serialized.encode('utf-8')).hexdigest()
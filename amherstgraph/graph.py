@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+The prerequisite graph of every course, and the subgraphs of departments.
+"""
+
+import itertools
+
+import igraph
+
+from .report import instrumented
+
+@instrumented
+def make_course_graph(course_details, prereqs):
+    """
+    Makes an igraph Graph object, complete_course_graph, from the edgelist of
+    prerequisite relations and the total number of courses and makes the
+    object global.  The graph's "name_index" attribute maps each course code
+    to its vertex id, each edge's "kind" attribute holds the kind of
+    prerequisite it is, and its "group" attribute the group of alternatives
+    of its course it is in (None unless its kind is 'or').
+    """
+    # list the required courses not in 'course_details', once each
+    all_courses = itertools.chain(*[(p, c) for p, c, kind, group
+                                    in prereqs])
+    extra_courses = []
+    seen = set()
+    for c in all_courses:
+        if c not in course_details and c not in seen:
+            extra_courses.append(c)
+            seen.add(c)
+    number_of_courses = len(extra_courses) + len(course_details)
+    
+    # create an empty graph with all the courses as nodes, then add prereq
+    # relations from the prereqs edgelist
+    names_of_courses = list(course_details.keys()) + extra_courses
+    complete_course_graph = igraph.Graph(number_of_courses, directed=True)
+    complete_course_graph.vs["name"] = names_of_courses
+    complete_course_graph["name_index"] = {name: vertex_id for vertex_id, name
+                                           in enumerate(names_of_courses)}
+    complete_course_graph.add_edges([(p, c) for p, c, kind, group
+                                     in prereqs])
+    complete_course_graph.es["kind"] = [kind for p, c, kind, group
+                                        in prereqs]
+    complete_course_graph.es["group"] = [group for p, c, kind, group
+                                         in prereqs]
+    return complete_course_graph
+
+@instrumented
+def make_subgraphs(dept_strings, course_details, complete_course_graph):
+    """
+    takes a list of department strings and returns a dictionary mapping each
+    to the subgraph make_subgraph would make for it.  The departments'
+    courses are collected in one pass over course_details, and the
+    neighborhood of each course is computed once however many departments
+    share it.
+    """
+    # get lists of courses in or related to each department
+    relevant_courses = {dept_string: [] for dept_string in dept_strings}
+    for k in course_details.keys():
+        for dept_string in itertools.chain(
+                course_details[k]["departments"],
+                course_details[k].get("related_departments", ())):
+            if dept_string in relevant_courses:
+                relevant_courses[dept_string].append(k)
+
+    # get the vertex ids of the relevant courses, and the neighborhood of
+    # each of them
+    name_index = complete_course_graph["name_index"]
+    relevant_course_vertex_ids = {dept_string: set(name_index[course]
+                                                   for course in courses)
+                                  for dept_string, courses
+                                  in relevant_courses.items()}
+    all_vertex_ids = sorted(set().union(*relevant_course_vertex_ids.values()))
+    neighborhoods = complete_course_graph.neighborhood(all_vertex_ids)
+    neighborhoods = dict(zip(all_vertex_ids, neighborhoods))
+
+    # make graphs containing all courses requiring or required by each
+    # department's courses
+    subgraphs = {}
+    for dept_string, vertex_ids in relevant_course_vertex_ids.items():
+        neighbors = set()
+        for vertex_id in vertex_ids:
+            neighbors.update(neighborhoods[vertex_id])
+        subgraphs[dept_string] = \
+            complete_course_graph.induced_subgraph(sorted(neighbors))
+    return subgraphs
+
+def make_view_subgraph(complete_course_graph, course_details, dept_strings=(),
+                       codes=(), hops=1):
+    """
+    returns the subgraph of an arbitrary view of the catalog: the courses of
+    the departments in dept_strings with their neighbors, as make_subgraphs
+    finds them, together with every course within hops prerequisites (in
+    either direction) of the courses whose codes are listed
+    """
+    name_index = complete_course_graph["name_index"]
+    dept_set = set(dept_strings)
+    centers = []
+    for k in course_details.keys():
+        if dept_set.intersection(itertools.chain(
+                course_details[k]["departments"],
+                course_details[k].get("related_departments", ()))):
+            centers.append(name_index[k])
+    vertex_ids = set()
+    for neighbors in complete_course_graph.neighborhood(centers):
+        vertex_ids.update(neighbors)
+    for neighbors in complete_course_graph.neighborhood(
+            [name_index[code] for code in codes], order=hops):
+        vertex_ids.update(neighbors)
+    return complete_course_graph.induced_subgraph(sorted(vertex_ids))
+
+def make_subgraph(dept_string, course_details, complete_course_graph):
+    """
+    takes a department string, and finds all courses in this department or
+    required by the department, and create a new igraph object from these
+    courses and their relationships.
+
+    Here are the current dept_strings:
+     'art',	 'Biology',	 'sexuality_womens_gender_studies'
+     'ljst',	 'physics',	 'biochemistry-biophysics',
+     'film',	 'russian',	 'anthropology_sociology',
+     'asian',	 'classics',	 'environmental_studies',
+     'music',	 'religion',	 'architectural_studies',
+     'french',	 'chemistry',	 'political_science',
+     'german',	 'astronomy',	 'computer_science',
+     'history',	 'economics',	 'american_studies',
+     'english',	 'psychology',	 'european_studies',
+     'geology',	 'philosophy',	 'black_studies',
+     'spanish',	 'mathematics',	 'theater_dance',
+     'courses',	 'neuroscience'
+    """
+    return make_subgraphs([dept_string], course_details,
+                          complete_course_graph)[dept_string]
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental builds, which redo only the work whose inputs changed since the
+last build.
+"""
+
+import json
+import os
+
+from .files import get_fingerprint, write_atomically
+from .prereqs import get_course_prereqs
+from .report import instrumented
+
+# incremental builds: a manifest saved at MANIFEST_PATH after each build
+# records a fingerprint of every course record and its prerequisites, and of
+# every department's subgraph, so that the next build only redoes the work
+# whose inputs changed
+MANIFEST_PATH = './build_manifest.json'
+INCREMENTAL = True
+# change PREREQ_FORMAT whenever get_course_prereqs changes what it extracts,
+# so that prerequisites recorded by older builds are extracted again
+PREREQ_FORMAT = 'grouped-1'
+# change EXPORT_FORMAT whenever export_json changes what it writes, so that
+# departments exported by older builds are exported again
+EXPORT_FORMAT = 'grouped-1'
+
+
+def add_fingerprints(course_details):
+    """
+    stores a fingerprint of each course record in course_details under the
+    key "fingerprint"
+    """
+    for record in course_details.values():
+        record.pop("fingerprint", None)
+        record["fingerprint"] = get_fingerprint(dict(record.items()))
+
+
+def load_manifest(path=None):
+    """
+    returns the manifest of the last build, read from path (MANIFEST_PATH
+    if None), or an empty one if there is none
+    """
+    if path is None:
+        path = MANIFEST_PATH
+    manifest = {"courses": {}, "departments": {}, "layouts": {}}
+    if os.path.exists(path):
+        with open(path) as manifest_file:
+            manifest.update(json.load(manifest_file))
+    return manifest
+
+
+def save_manifest(manifest, path=None):
+    """
+    writes the manifest of this build for the next one to compare against
+    to path (MANIFEST_PATH if None)
+    """
+    if path is None:
+        path = MANIFEST_PATH
+    write_atomically(path, json.dumps(manifest, sort_keys=True).encode('utf-8'))
+
+
+@instrumented
+def get_prereqs_incremental(course_details, manifest):
+    """
+    does the work of get_prereqs, but reuses the prerequisites recorded in
+    the manifest for every course whose requisite line has not changed.
+    Records the fingerprints and prerequisites of this build in the
+    manifest.
+    """
+    prereqs = []
+    previous_courses = manifest["courses"]
+    courses = {}
+    for k in course_details.keys():
+        rline_fingerprint = get_fingerprint([PREREQ_FORMAT,
+                                             course_details[k]["rline"]])
+        previous = previous_courses.get(k)
+        if previous is not None and previous["rline"] == rline_fingerprint:
+            course_prereqs = [tuple(edge) for edge in previous["prereqs"]]
+        else:
+            course_prereqs = get_course_prereqs(k, course_details[k]["rline"])
+        courses[k] = {"fingerprint": course_details[k].get("fingerprint"),
+                      "rline": rline_fingerprint,
+                      "prereqs": course_prereqs}
+        prereqs += course_prereqs
+    manifest["courses"] = courses
+    return prereqs
+
+
+def get_export_settings():
+    """
+    returns the settings of the export stage which change what it writes
+    for a department: EXPORT_FORMAT, whether and where the shared course
+    store is written, whether the search index is, and the compressed
+    sidecars written beside each file and their levels
+    """
+    from . import export, search
+    return [EXPORT_FORMAT, export.SHARED_STORE,
+            os.path.normpath(export.STORE_DIR), search.EXPORT_SEARCH_INDEX,
+            sorted(export.get_sidecar_compressors()), export.GZIP_LEVEL,
+            export.BROTLI_QUALITY]
+
+
+def get_subgraph_fingerprint(subgraph, course_details, global_layout=None,
+                             ancestors=None, settings=None):
+    """
+    returns a fingerprint of a department's subgraph covering its courses,
+    the details of each course, and the prerequisite edges between them
+    with their groups of alternatives, as well as the courses' positions if
+    a global layout is given, the courses each requires at any remove if the
+    subgraph's ancestors are, and the export settings if they are (see
+    get_export_settings)
+    """
+    names = subgraph.vs["name"]
+    if global_layout is None:
+        global_layout = {}
+    if ancestors is None:
+        ancestors = [[] for name in names]
+    nodes = sorted([name, course_details.get(name, {}).get("fingerprint"),
+                    global_layout.get(name),
+                    sorted(names[ancestor] for ancestor in ancestors[i])]
+                   for i, name in enumerate(names))
+    groups = subgraph.es["group"] if "group" in subgraph.es.attributes() \
+        else [None] * subgraph.ecount()
+    edges = sorted([names[source], names[target], group]
+                   for (source, target), group
+                   in zip(subgraph.get_edgelist(), groups))
+    if settings is None:
+        return get_fingerprint([nodes, edges])
+    return get_fingerprint([settings, nodes, edges])
+
+
+@instrumented
+def export_changed_json(dept_strings, course_details, complete_course_graph,
+                        manifest, jobs=None, subgraphs=None):
+    """
+    exports data.json, as export_departments does, only for the departments
+    whose subgraph fingerprint (with the export settings) differs from the
+    one in the manifest or whose data.json (or search.json, if
+    EXPORT_SEARCH_INDEX is set) is missing, and returns the errors of
+    export_departments.  The subgraphs of make_subgraphs may be passed in
+    to save remaking them.  Records the new fingerprints of the departments
+    exported, and the names of their cached layouts, in the manifest.
+    """
+    # imported here so that reading and writing manifests does not load
+    # igraph
+    from .export import EXPORT_JOBS, export_departments
+    from .graph import make_subgraphs
+    from .reachability import get_subgraph_ancestors
+    from . import search
+    if jobs is None:
+        jobs = EXPORT_JOBS
+    if subgraphs is None:
+        subgraphs = make_subgraphs(dept_strings, course_details,
+                                   complete_course_graph)
+    changed_subgraphs = {}
+    fingerprints = {}
+    settings = get_export_settings()
+    global_layout = None
+    if "global_layout" in complete_course_graph.attributes():
+        global_layout = complete_course_graph["global_layout"]
+    reachability = None
+    if "reachability" in complete_course_graph.attributes():
+        reachability = complete_course_graph["reachability"]
+    for dept_string, subgraph in subgraphs.items():
+        ancestors = None
+        if reachability is not None:
+            ancestors = get_subgraph_ancestors(subgraph, reachability)
+        fingerprint = get_subgraph_fingerprint(subgraph, course_details,
+                                               global_layout, ancestors,
+                                               settings)
+        paths = ['./' + dept_string + '/data.json']
+        if search.EXPORT_SEARCH_INDEX:
+            paths.append('./' + dept_string + '/search.json')
+        if manifest["departments"].get(dept_string) == fingerprint and \
+                all(os.path.exists(path) for path in paths):
+            continue
+        changed_subgraphs[dept_string] = subgraph
+        fingerprints[dept_string] = fingerprint
+    errors = export_departments(changed_subgraphs, course_details,
+                                complete_course_graph, jobs,
+                                manifest["layouts"])
+    for dept_string, fingerprint in fingerprints.items():
+        if dept_string not in errors:
+            manifest["departments"][dept_string] = fingerprint
+    return errors
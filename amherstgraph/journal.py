@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+The journal of a crawl: the catalog and courses stages append a line to it
+for every page they finish, holding what they read from the page, and for
+every page they fail to fetch or read, holding the error.  A crawl which
+dies or is rate-limited part way is resumed from the journal by the next
+run, which reads only the pages not yet finished, retrying those which
+failed, and the journal is deleted once a crawl finishes every page.
+"""
+
+import json
+import os
+import threading
+import time
+
+from .report import RUN_REPORT
+
+# the journal of the crawl in progress, in json lines: a first line with the
+# time the crawl started, then one line per page.  A journal more than
+# JOURNAL_MAX_AGE seconds old is discarded rather than resumed, as the pages
+# it holds may have changed since.
+JOURNAL_PATH = './.build_state/crawl_journal.jsonl'
+JOURNAL_MAX_AGE = 24 * 3600
+JOURNAL_LOCK = threading.Lock()
+
+# the kinds of pages journaled, with how the coverage summary names them
+PAGE_KINDS = {'catalog': 'catalog pages',
+              'curriculum': 'curriculum pages',
+              'course': 'course pages'}
+
+
+def load_journal(path=None, max_age=None):
+    """
+    returns the journal at path (JOURNAL_PATH if None), starting a new one
+    if there is none or it is older than max_age seconds (JOURNAL_MAX_AGE if
+    None): a dictionary of its "path", the time it was "started", the
+    "pages" it holds, mapping each kind of page to a dictionary of the last
+    entry of each url, and the urls of each kind "resumed" from the file
+    """
+    if path is None:
+        path = JOURNAL_PATH
+    if max_age is None:
+        max_age = JOURNAL_MAX_AGE
+    journal = {"path": path, "started": None,
+               "pages": {kind: {} for kind in PAGE_KINDS},
+               "resumed": {kind: set() for kind in PAGE_KINDS}}
+    if os.path.exists(path):
+        with open(path) as journal_file:
+            for line in journal_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # the last line of a run which died while writing it
+                    continue
+                if "started" in entry:
+                    journal["started"] = entry["started"]
+                else:
+                    journal["pages"][entry["kind"]][entry["url"]] = entry
+        if journal["started"] is None or \
+                time.time() - journal["started"] > max_age:
+            os.remove(path)
+            return load_journal(path, max_age)
+        for kind, pages in journal["pages"].items():
+            journal["resumed"][kind].update(url for url, entry
+                                            in pages.items()
+                                            if "result" in entry)
+    else:
+        directory = os.path.dirname(path)
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        journal["started"] = time.time()
+        with open(path, 'w') as journal_file:
+            journal_file.write(json.dumps({"started": journal["started"]}) +
+                               '\n')
+    return journal
+
+
+def record_page(journal, kind, url, result=None, error=None):
+    """
+    appends the entry of a page to the journal: the json-serializable result
+    read from it, or the error which stopped it being read
+    """
+    entry = {"kind": kind, "url": url}
+    if error is None:
+        entry["result"] = result
+    else:
+        entry["error"] = '{}: {}'.format(type(error).__name__, error)
+    with JOURNAL_LOCK:
+        with open(journal["path"], 'a') as journal_file:
+            journal_file.write(json.dumps(entry) + '\n')
+        journal["pages"][kind][url] = entry
+
+
+def get_finished_pages(journal, kind):
+    """
+    returns a dictionary mapping the url of every page of a kind the journal
+    has finished to its result
+    """
+    if journal is None:
+        return {}
+    return {url: entry["result"] for url, entry
+            in journal["pages"][kind].items() if "result" in entry}
+
+
+def get_failed_pages(journal, kind):
+    """
+    returns a dictionary mapping the url of every page of a kind which
+    failed, and has not been read since, to its error
+    """
+    if journal is None:
+        return {}
+    return {url: entry["error"] for url, entry
+            in journal["pages"][kind].items() if "error" in entry}
+
+
+def get_coverage(journal):
+    """
+    returns the coverage of the crawl: for each kind of page, the number
+    finished, those of them resumed from an earlier run's journal, and the
+    number failed
+    """
+    coverage = {}
+    for kind in PAGE_KINDS:
+        finished = get_finished_pages(journal, kind)
+        coverage[kind] = {"finished": len(finished),
+                          "resumed": len(journal["resumed"][kind].
+                                         intersection(finished)),
+                          "failed": len(get_failed_pages(journal, kind))}
+    return coverage
+
+
+def finish_journal(journal):
+    """
+    prints the coverage of the crawl and records it in RUN_REPORT, then
+    deletes the journal if every page was read, or else prints the pages
+    which failed, records them in RUN_REPORT under "crawl_failures" and
+    keeps the journal for the next run to retry them.  Returns a dictionary
+    mapping the url of each page which failed to its error.
+    """
+    coverage = get_coverage(journal)
+    RUN_REPORT["crawl"] = coverage
+    for kind, counts in coverage.items():
+        print('{}: {} read ({} resumed from the journal), {} failed'.format(
+            PAGE_KINDS[kind], counts["finished"], counts["resumed"],
+            counts["failed"]))
+    failures = {}
+    for kind in PAGE_KINDS:
+        failures.update(get_failed_pages(journal, kind))
+    RUN_REPORT["crawl_failures"] = failures
+    if failures:
+        print('{} pages failed; run again to retry only them:\n{}'.format(
+            len(failures), '\n'.join('{} ({})'.format(url, error) for
+                                     url, error in sorted(failures.items()))))
+    else:
+        os.remove(journal["path"])
+    return failures
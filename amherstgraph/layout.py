@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Layered layouts of prerequisite graphs, cached on disk by graph structure.
+"""
+
+import json
+import os
+
+from .files import get_fingerprint, write_atomically
+from .report import instrumented
+
+# layouts are cached in LAYOUT_CACHE_DIR under a fingerprint of the course
+# names and prerequisite edges they lay out, so departments with identical
+# subgraphs, and unchanged departments in later builds, reuse them.  With
+# GLOBAL_LAYOUT set, the complete graph is laid out once and every department
+# takes its courses' coordinates from that layout instead.  Each graph laid
+# out records the name of its cached layout as its attribute "layout_key",
+# and after each export prune_layout_cache deletes the layouts no department
+# uses any more.  The server lays out its views into the same cache, so the
+# layouts written since the build started are kept.
+LAYOUT_CACHE_DIR = './.layout_cache'
+GLOBAL_LAYOUT = False
+
+
+def get_structure_fingerprint(graph):
+    """
+    returns a fingerprint of a graph's course names and prerequisite edges,
+    independent of the order of its vertices and edges
+    """
+    names = graph.vs["name"]
+    edges = sorted([names[source], names[target]]
+                   for source, target in graph.get_edgelist())
+    return get_fingerprint([sorted(names), edges])
+
+
+def get_sugiyama_layout(subgraph):
+    """
+    This function sorts a prerequisites graph into 100,200,300, and 400-level
+    classes, then returns the x and y positions of each node in that layout.
+    The graph is laid out with its courses in sorted order, so that the same
+    courses and prerequisites always get the same layout, and the layout is
+    cached on disk, under the name recorded in the graph's "layout_key".
+    """
+    subgraph["layout_key"] = get_structure_fingerprint(subgraph)
+    cache_path = os.path.join(LAYOUT_CACHE_DIR,
+                              subgraph["layout_key"] + '.json')
+    if os.path.exists(cache_path):
+        with open(cache_path) as cache_file:
+            positions = json.load(cache_file)
+        return [positions[name] for name in subgraph.vs["name"]]
+
+    # put the courses in sorted order
+    names = subgraph.vs["name"]
+    sorted_names = sorted(names)
+    new_ids = {name: new_id for new_id, name in enumerate(sorted_names)}
+    canonical_graph = subgraph.permute_vertices([new_ids[name]
+                                                 for name in names])
+
+    # get a list of course levels corresponding to each course-node
+    course_levels = []
+    for course_name in sorted_names:
+        for letter in course_name:
+            if letter.isnumeric():
+                course_levels.append(int(letter))
+                break
+
+    # get the layout object
+    sugiyama_layout = canonical_graph.layout_sugiyama(layers=course_levels, \
+                                                      maxiter=1000)
+    positions = dict(zip(sorted_names,
+                         sugiyama_layout[0:canonical_graph.vcount()]))
+    write_atomically(cache_path, json.dumps(positions).encode('utf-8'))
+    return [positions[name] for name in names]
+
+
+@instrumented
+def add_global_layout(complete_course_graph):
+    """
+    lays out the complete course graph by course level once, storing the
+    position of every course in the graph's "global_layout" attribute for
+    get_layout to use
+    """
+    positions = get_sugiyama_layout(complete_course_graph)
+    complete_course_graph["global_layout"] = \
+        dict(zip(complete_course_graph.vs["name"], positions))
+
+
+def get_layout(subgraph, complete_course_graph):
+    """
+    returns the x and y positions of each node in a department's subgraph,
+    taken from the complete graph's global layout if it has one, or else
+    from the subgraph's own layered layout
+    """
+    if "global_layout" in complete_course_graph.attributes():
+        positions = complete_course_graph["global_layout"]
+        return [positions[name] for name in subgraph.vs["name"]]
+    return get_sugiyama_layout(subgraph)
+
+
+@instrumented
+def prune_layout_cache(layout_keys, since):
+    """
+    deletes the layouts in the layout cache other than those named in
+    layout_keys (the "layout_key" of every department's subgraph, or of the
+    complete graph if GLOBAL_LAYOUT is set) and those written since the
+    time since, which the server may have laid out for its views
+    """
+    if not os.path.exists(LAYOUT_CACHE_DIR):
+        return
+    kept = set(layout_key + '.json' for layout_key in layout_keys)
+    for file_name in os.listdir(LAYOUT_CACHE_DIR):
+        path = os.path.join(LAYOUT_CACHE_DIR, file_name)
+        if file_name not in kept and os.path.getmtime(path) < since:
+            os.remove(path)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Reading course pages into the course records of course_details.
+"""
+
+import re
+
+from lxml import etree
+
+from .crawl import get_course_code, get_url_departments, record_failure
+from .journal import get_finished_pages, record_page
+from .records import CourseRecord
+from .report import add_counts, instrumented
+from .web import fetch_all
+
+# course pages are read with precompiled xpaths; smart_strings=False makes
+# them return plain strings, which do not keep the parsed page alive
+COURSE_LIST_ID = b'academics-course-list'
+TEXT_XPATH = etree.XPath('text()', smart_strings=False)
+CHARSET_PATTERN = re.compile(br'<meta[^>]*charset=["\']?([-\w]+)', re.I)
+PAGE_CHUNK_SIZE = 16384
+
+
+def read_course_list(course_list):
+    """
+    reads the element with the id academics-course-list in one pass over its
+    children, returning a tuple (texts, title) of the text of its
+    paragraphs, in order, and the text of its first heading (or None)
+    """
+    texts = []
+    title = None
+    for child in course_list:
+        if child.tag == 'p':
+            texts += TEXT_XPATH(child)
+        elif child.tag == 'h2' and title is None:
+            headings = TEXT_XPATH(child)
+            if len(headings) > 0:
+                title = headings[0]
+    return texts, title
+
+
+def parse_course_page(data):
+    """
+    returns read_course_list of the course list of a course page, or
+    ([], None) if it has none.  Only the fragment of the page from the tag
+    opening the course list onwards is parsed, in the charset the page
+    declares, and it is parsed incrementally: each element which ends
+    outside the course list is discarded as soon as it has been parsed, and
+    parsing stops where the course list ends.
+    """
+    id_index = data.find(COURSE_LIST_ID)
+    if id_index < 0:
+        return [], None
+    fragment_start = data.rfind(b'<', 0, id_index)
+    charset = CHARSET_PATTERN.search(data, 0, fragment_start)
+    if charset is not None:
+        charset = charset.group(1).decode('ascii')
+
+    parser = etree.HTMLPullParser(events=('start', 'end'), encoding=charset)
+    depth = 0 # how deep inside the course list the parser is
+    end = len(data) + PAGE_CHUNK_SIZE
+    for start in range(fragment_start, end, PAGE_CHUNK_SIZE):
+        if start < len(data):
+            parser.feed(data[start:start + PAGE_CHUNK_SIZE])
+        else:
+            parser.close()
+        for event, element in parser.read_events():
+            if event == 'start':
+                if depth > 0 or \
+                        element.get('id') == COURSE_LIST_ID.decode('ascii'):
+                    depth += 1
+            elif depth == 0:
+                element.clear()
+            else:
+                depth -= 1
+                if depth == 0:
+                    return read_course_list(element)
+    return [], None
+
+
+@instrumented
+def get_course_info(unique_recent_urls, course_urls, max_workers=None,
+                    journal=None):
+    """
+    This chunk creates a dictionary, course_details, with the following
+    format:
+    {"CNUM-000":{ "departments" : a list of department codes (for partitioning
+                              the nodes in the visualisation),
+                 "url"    : a string linking to the course description in
+                            another tab (for display in the visualisation as
+                             a node attribute)
+                 "rline"  : a string of the course title (the label of each
+                            node inthe visualization)
+                }
+    Each record is a CourseRecord, read and written like a dictionary.
+    The course pages are fetched concurrently, max_workers at a time
+    (MAX_WORKERS if None).
+    Given a journal, the pages it has finished are not fetched again, and
+    each page read, or which fails to be, is recorded in it, a failure
+    leaving its course out; without one, a failure is raised.
+    """
+    # get a dict of course details
+    course_details = {}
+    url_departments = get_url_departments(course_urls)
+    pages = get_finished_pages(journal, 'course')
+    add_counts(pages_resumed=sum(url in pages for url in unique_recent_urls))
+    unread_urls = [url for url in unique_recent_urls if url not in pages]
+
+    for url, data in fetch_all(unread_urls, max_workers):
+        try:
+            if isinstance(data, Exception):
+                raise data
+            texts, title = parse_course_page(data)
+        except Exception as error:
+            if journal is None:
+                raise
+            record_failure(journal, 'course', url, error)
+            continue
+        description = [t for t in texts if 'Requisite:' not in t]
+        description = '\n'.join(description)
+        reqline = [t for t in texts if 'Requisite:' in t]
+        pages[url] = {"description": description,
+                      "rline": reqline,
+                      "title": title}
+        if journal is not None:
+            record_page(journal, 'course', url, pages[url])
+
+    for url in unique_recent_urls:
+        if url not in pages:
+            continue
+        code = get_course_code(url)
+        depts = url_departments.get(url, [])
+        title = pages[url]["title"]
+        if title is None:
+            title = code
+        course_details[code] = CourseRecord('http://' + url, depts,
+                                            pages[url]["description"],
+                                            pages[url]["rline"], title)
+    return course_details
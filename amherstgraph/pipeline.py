@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+The stages of a build, run in order by run_pipeline:
+
+    catalog  crawls the department catalogs for the courses each lists and
+             the courses related to each major
+    courses  reads the most recent page of every course into course_details
+    prereqs  extracts the prerequisites of every course
+    export   builds the prerequisite graph and exports each department's
+             data.json
+
+The catalog stage saves what it produced in STATE_DIR, and every stage
+records what it produced in the course database (see database.py), from
+which the courses stage reads back course_details and the export stage the
+prerequisites of a build which did not run the stages before them.  So a
+later run can start (or resume) from any stage instead of crawling again.
+Given a selection of departments, the catalog and courses stages crawl only
+those departments, merging what they find into the saved state and the
+database, and the export stage exports only them.  The catalog and courses
+stages record every page they read in the crawl journal (see journal.py),
+so that a crawl which stops part way is resumed by the next run.  Pages
+which could not be read are left out of the later stages, which run on
+every other page, and are retried by the next run; the run fails once it
+has exported what it read.
+Each stage imports the modules it needs when it runs.
+"""
+
+import json
+import os
+import time
+
+from .files import write_atomically
+
+STAGES = ('catalog', 'courses', 'prereqs', 'export')
+STATE_DIR = './.build_state'
+
+
+def save_state(stage_name, state):
+    "saves the json-serializable state a stage produced"
+    path = os.path.join(STATE_DIR, stage_name + '.json')
+    write_atomically(path, json.dumps(state).encode('utf-8'))
+
+
+def load_state(stage_name, default=None):
+    """
+    returns the state a stage last saved, or default if there is none and
+    default is not None
+    """
+    path = os.path.join(STATE_DIR, stage_name + '.json')
+    if not os.path.exists(path):
+        if default is not None:
+            return default
+        raise FileNotFoundError('no saved state for the {} stage in {}: run '
+                                'it first'.format(stage_name, STATE_DIR))
+    with open(path) as state_file:
+        return json.load(state_file)
+
+
+def get_catalog_department(catalog_url):
+    "returns the department string of a department catalog url"
+    return catalog_url.split('/')[3]
+
+
+def load_courses(connection, catalog):
+    """
+    returns the course_details recorded in the course database of the
+    courses listed in the semesters of the catalog state; raises a
+    LookupError if there are none
+    """
+    from .database import get_catalog_semesters, load_course_details
+    course_details = load_course_details(
+        connection, get_catalog_semesters(catalog["catalog_urls"]))
+    if not course_details:
+        raise LookupError('no courses of the catalogs crawled are in the '
+                          'course database: run the courses stage first')
+    return course_details
+
+
+def run_catalog_stage(connection, dept_strings=None, journal=None):
+    """
+    crawls the catalogs of the departments in dept_strings (all of them if
+    None), resuming the crawl of the journal if one is given, records what
+    they list in the course database and returns the catalog state: the
+    catalog urls, the course urls each department lists and the courses
+    related to each major, merged into the saved state if only some
+    departments were crawled
+    """
+    from .crawl import (get_catalog_pages, get_catalog_urls, get_courses,
+                        get_date, get_related_courses)
+    from .database import write_catalog
+    from .journal import get_failed_pages
+    catalog_urls = get_date(get_catalog_urls())
+    state = {"catalog_urls": [], "course_urls": {}, "related_courses": {}}
+    if dept_strings is not None:
+        catalog_urls = [url for url in catalog_urls
+                        if get_catalog_department(url) in dept_strings]
+        state = load_state('catalog', state)
+    catalog_pages = get_catalog_pages(catalog_urls, journal=journal)
+    crawled_urls = set(catalog_urls)
+    state["catalog_urls"] = [url for url in state["catalog_urls"]
+                             if url not in crawled_urls] + catalog_urls
+    course_urls = get_courses(catalog_urls, catalog_pages=catalog_pages,
+                              journal=journal)
+    related_courses = get_related_courses(catalog_urls,
+                                          catalog_pages=catalog_pages,
+                                          journal=journal)
+
+    # what failed is kept as it was until a later run reads it
+    failed_urls = get_failed_pages(journal, 'catalog')
+    failed_depts = set(get_catalog_department(url) for url
+                       in get_failed_pages(journal, 'curriculum'))
+    related_courses = {dept: codes for dept, codes in related_courses.items()
+                       if dept not in failed_depts}
+    write_catalog(connection, [url for url in catalog_urls
+                               if url not in failed_urls],
+                  course_urls, related_courses)
+    state["course_urls"].update(course_urls)
+    state["related_courses"].update(related_courses)
+    return state
+
+
+def run_courses_stage(connection, catalog, dept_strings=None, journal=None):
+    """
+    reads the most recent page of every course listed by the departments in
+    dept_strings (all of them if None), resuming the crawl of the journal if
+    one is given, records them in the course database and returns the
+    course_details of every course the catalogs list, read back from it
+    """
+    from .crawl import get_most_recent_course_urls
+    from .database import write_courses
+    from .parse import get_course_info
+    course_urls = catalog["course_urls"]
+    if dept_strings is not None:
+        course_urls = {dept: urls for dept, urls in course_urls.items()
+                       if dept in dept_strings}
+    unique_recent_urls = get_most_recent_course_urls(course_urls)
+    write_courses(connection, get_course_info(unique_recent_urls,
+                                              catalog["course_urls"],
+                                              journal=journal))
+    return load_courses(connection, catalog)
+
+
+def run_prereqs_stage(connection, course_details, manifest=None):
+    """
+    returns the prerequisites of every course in course_details, reusing
+    those recorded in the manifest of an incremental build, and records
+    them in the course database
+    """
+    from .database import write_prereqs
+    from .prereqs import get_prereqs, test_prereqs
+    if manifest is not None:
+        from .incremental import get_prereqs_incremental
+        prereqs = get_prereqs_incremental(course_details, manifest)
+    else:
+        prereqs = get_prereqs(course_details)
+    test_prereqs(prereqs, course_details)
+    write_prereqs(connection, course_details.keys(), prereqs)
+    return prereqs
+
+
+def build_course_graph(course_details, prereqs):
+    """
+    returns the prerequisite graph of course_details as the export stage
+    builds it: with its global layout if GLOBAL_LAYOUT is set and its
+    reachability index if EXPORT_REACHABILITY is
+    """
+    from . import layout, reachability
+    from .graph import make_course_graph
+    prereqs = [tuple(prereq) for prereq in prereqs]
+    complete_course_graph = make_course_graph(course_details, prereqs)
+    if layout.GLOBAL_LAYOUT:
+        layout.add_global_layout(complete_course_graph)
+    if reachability.EXPORT_REACHABILITY:
+        reachability.add_reachability_index(complete_course_graph)
+    return complete_course_graph
+
+
+def load_course_graph():
+    """
+    returns the course_details and the prerequisite graph of the last
+    build, read from the saved catalog state and the course database
+    """
+    from .database import connect_database, load_prereqs
+    catalog = load_state('catalog')
+    connection = connect_database()
+    try:
+        course_details = load_courses(connection, catalog)
+        prereqs = load_prereqs(connection, course_details.keys())
+    finally:
+        connection.close()
+    return course_details, build_course_graph(course_details, prereqs)
+
+
+def run_export_stage(course_details, prereqs, dept_strings, jobs,
+                     manifest=None, started=None):
+    """
+    builds the prerequisite graph with build_course_graph and exports the
+    departments in dept_strings with jobs worker processes (EXPORT_JOBS if
+    None), only those which changed in an incremental build, returning the
+    errors of the departments which failed.  Then prunes the course store
+    and the layout cache of what no department uses, keeping the layouts
+    written since the time started (the start of the stage if None), and
+    keeping every layout if only some departments were exported without a
+    manifest recording the layouts of the others.
+    """
+    if started is None:
+        started = time.time()
+    from . import export, layout
+    from .departments import DEPT_CODES
+    from .graph import make_subgraphs
+    from .incremental import export_changed_json
+    if jobs is None:
+        jobs = export.EXPORT_JOBS
+    complete_course_graph = build_course_graph(course_details, prereqs)
+    subgraphs = make_subgraphs(dept_strings, course_details,
+                               complete_course_graph)
+    if manifest is not None:
+        errors = export_changed_json(dept_strings, course_details,
+                                     complete_course_graph, manifest, jobs,
+                                     subgraphs)
+        layout_keys = manifest["layouts"]
+    else:
+        layout_keys = {}
+        errors = export.export_departments(subgraphs, course_details,
+                                           complete_course_graph, jobs,
+                                           layout_keys)
+    if export.SHARED_STORE:
+        export.prune_store(DEPT_CODES.keys())
+    if layout.GLOBAL_LAYOUT:
+        layout.prune_layout_cache([complete_course_graph["layout_key"]],
+                                  started)
+    elif manifest is not None or set(dept_strings) >= set(DEPT_CODES):
+        layout.prune_layout_cache(layout_keys.values(), started)
+    return errors
+
+
+def run_pipeline(stages=STAGES, dept_strings=None, jobs=None,
+                 incremental=None):
+    """
+    runs the named stages in order for the departments in dept_strings (all
+    of them if None), with jobs export worker processes (EXPORT_JOBS if
+    None), loading the saved state of the stages before them which are not
+    run.  An incremental build (the default if INCREMENTAL is set) reads and
+    updates the build manifest.  Returns the errors of the departments whose
+    export failed and of the pages the crawl could not read, keyed by
+    department string or url.
+    """
+    from .database import connect_database, load_prereqs
+    from .departments import DEPT_CODES
+    from . import incremental as incremental_builds
+    from .journal import finish_journal, load_journal
+    if incremental is None:
+        incremental = incremental_builds.INCREMENTAL
+    if incremental:
+        manifest = incremental_builds.load_manifest()
+    else:
+        manifest = None
+    started = time.time()
+    errors = {}
+    crawl_errors = {}
+    catalog = course_details = prereqs = None
+
+    connection = connect_database()
+    try:
+        if 'catalog' in stages or 'courses' in stages:
+            journal = load_journal()
+        if 'catalog' in stages:
+            catalog = run_catalog_stage(connection, dept_strings, journal)
+            save_state('catalog', catalog)
+        if 'courses' in stages:
+            course_details = run_courses_stage(
+                connection, catalog or load_state('catalog'), dept_strings,
+                journal)
+        if 'catalog' in stages or 'courses' in stages:
+            from .web import prune_cache
+            crawl_errors = finish_journal(journal)
+            prune_cache()
+        if course_details is None and ('prereqs' in stages or
+                                       'export' in stages):
+            course_details = load_courses(connection,
+                                          catalog or load_state('catalog'))
+        if 'prereqs' in stages:
+            prereqs = run_prereqs_stage(connection, course_details, manifest)
+        if 'export' in stages:
+            if prereqs is None:
+                prereqs = load_prereqs(connection, course_details.keys())
+            errors = run_export_stage(course_details, prereqs,
+                                      dept_strings or list(DEPT_CODES.keys()),
+                                      jobs, manifest, started)
+    finally:
+        connection.close()
+    if manifest is not None:
+        incremental_builds.save_manifest(manifest)
+    errors.update(crawl_errors)
+    return errors
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+Extracting typed prerequisite edges from the requisite lines of course
+records.
+"""
+
+import functools
+import itertools
+import re
+from collections import OrderedDict
+
+from .departments import DEPT_SET
+from .report import instrumented
+
+# requisite lines are read as a stream of tokens: words (department codes,
+# conjunctions, "recommended"), numbers (3-digit ones are course numbers,
+# "100-level" ones and ranges like "200-290" or "111 to 318" are not) and
+# the punctuation separating them.  The same lines recur across
+# cross-listings and years of catalogs, so each line's reading is memoized.
+PREREQ_TOKEN_PATTERN = re.compile(
+    r'[A-Za-z]+|\d+(?: ?- ?| to )\d+|\d+(?:[- ]level)?|[.;,/()]')
+PREREQ_KINDS = ('required', 'recommended', 'or')
+PREREQ_CACHE_SIZE = 2**16
+
+# the words which, followed by "of", introduce a list of alternatives:
+# "one of the following", "any two of", "either of"; the words introducing
+# the old number of a course, which is an alternative to the new one:
+# "STAT 111 (previously MATH 130)"; and the words of clauses naming courses
+# which are not requisites: "Not open to students who have taken ECON 275",
+# "Consent of the instructor required for students who have taken ECON 435"
+CHOICE_WORDS = frozenset(['ONE', 'TWO', 'THREE', 'FOUR', 'ANY', 'EITHER'])
+RENUMBERED_WORDS = frozenset(['FORMERLY', 'PREVIOUSLY'])
+EXCLUDING_WORDS = frozenset(['NOT', 'WHO'])
+
+# department codes misspelled in the catalogs.  A capitalized four-letter
+# word before a course number which is not a department code is read as the
+# code it is an alias of, or else the one code it is an anagram of, or else
+# as a department of its own, rather than leaving the number to the last
+# department named.
+DEPT_ALIASES = {'LSJT': 'LJST'}
+
+
+def resolve_dept(word):
+    """
+    returns the department code a capitalized word before a course number
+    stands for, as described at DEPT_ALIASES
+    """
+    if word in DEPT_ALIASES:
+        return DEPT_ALIASES[word]
+    anagrams = [code for code in DEPT_SET if sorted(code) == sorted(word)]
+    if len(anagrams) == 1:
+        return anagrams[0]
+    return word
+
+
+@functools.lru_cache(maxsize=PREREQ_CACHE_SIZE)
+def read_requisite_line(line, current_dept):
+    """
+    reads one requisite line, in which course numbers without a department
+    take the last department named, starting with current_dept.  Returns a
+    tuple (prereqs, current_dept) of a tuple of the (prereq, kind, group)
+    triples it names, in order, and the last department it names, where
+    group numbers the groups of alternatives of the line (None for courses
+    which are not alternatives).
+    """
+    # skip any description run into the requisite line, keeping the
+    # sentence which introduces the requisites
+    requisite = line.find('Requisite')
+    if requisite > 0:
+        line = line[line.rfind('.', 0, requisite) + 1:]
+
+    # read the line a clause at a time, collecting groups of courses which
+    # are alternatives to each other.  A comma-separated run of courses
+    # ending in "or" is one group of alternatives, unless a department is
+    # named after a comma, which starts a new run; every course after "one
+    # of" (or "any two of", ...) in its clause is one group; and a clause
+    # starting with "alternatively" is one group with the clause before it.
+    # Courses in parentheses saying "recommended" are recommended on their
+    # own, and the courses of clauses saying "not" or "who" are dropped.
+    tokens = PREREQ_TOKEN_PATTERN.findall(line) + ['.']
+    clauses = []
+    groups = []
+    run_start = 0
+    recommended = False
+    excluded = False
+    conjunction = None
+    choice = False
+    alternative = False
+    renumbered = False
+    parenthesis_start = None
+    parenthesis_recommended = False
+    for i, token in enumerate(tokens):
+        upper_token = token.upper()
+        if upper_token in DEPT_SET or (
+                token.isalpha() and token.isupper() and len(token) == 4 and
+                len(tokens[i + 1]) == 3 and tokens[i + 1].isdigit()):
+            current_dept = resolve_dept(upper_token) \
+                if upper_token not in DEPT_SET else upper_token
+            if conjunction == ',':
+                run_start = len(groups)
+        elif len(token) == 3 and token.isdigit():
+            prereq = current_dept + '-' + token
+            if (choice or renumbered) and len(groups) > 0:
+                groups[-1].append(prereq)
+            elif conjunction == '/' and len(groups) > 0:
+                groups[-1].append(prereq)
+            elif conjunction == 'or' and len(groups) > 0:
+                run = list(itertools.chain(*groups[run_start:]))
+                groups[run_start:] = [run + [prereq]]
+            else:
+                if conjunction != ',':
+                    run_start = len(groups)
+                groups.append([prereq])
+            conjunction = None
+        elif upper_token == 'OR' or token == '/':
+            conjunction = upper_token.lower()
+        elif token == ',':
+            conjunction = ','
+            renumbered = False
+            if len(groups) > 0 and len(groups[-1]) > 1:
+                run_start = len(groups)
+        elif upper_token == 'AND':
+            conjunction = 'and'
+        elif upper_token.startswith('RECOMMEND'):
+            if parenthesis_start is None:
+                recommended = True
+            else:
+                parenthesis_recommended = True
+        elif upper_token in EXCLUDING_WORDS:
+            excluded = True
+        elif upper_token in RENUMBERED_WORDS:
+            renumbered = True
+        elif upper_token == 'OF' and i > 0 and \
+                tokens[i - 1].upper() in CHOICE_WORDS and not choice:
+            choice = True
+            groups.append([])
+        elif upper_token == 'ALTERNATIVELY' and len(groups) == 0:
+            alternative = True
+        elif token == '(':
+            parenthesis_start = len(groups)
+        elif token == ')':
+            # courses recommended in parentheses are a clause of their own
+            if parenthesis_recommended and parenthesis_start is not None:
+                clauses.append((groups[parenthesis_start:], True, excluded))
+                del groups[parenthesis_start:]
+                run_start = min(run_start, len(groups))
+            parenthesis_start = None
+            parenthesis_recommended = False
+            renumbered = False
+        elif token in '.;':
+            # the end of a clause
+            groups = [group for group in groups if group]
+            if alternative and len(groups) > 0 and len(clauses) > 0 and \
+                    clauses[-1][1:] == (recommended, excluded):
+                groups = [list(itertools.chain(*clauses.pop()[0], *groups))]
+            clauses.append((groups, recommended, excluded))
+            groups = []
+            run_start = 0
+            recommended = False
+            excluded = False
+            conjunction = None
+            choice = False
+            alternative = False
+            renumbered = False
+            parenthesis_start = None
+            parenthesis_recommended = False
+
+    # list the courses of each clause, numbering the groups of alternatives
+    prereqs = []
+    number_of_groups = 0
+    for groups, recommended, excluded in clauses:
+        if excluded:
+            continue
+        for group in groups:
+            # a course named twice in a group, e.g. ECON 111/111E, is one
+            group = list(OrderedDict.fromkeys(group))
+            if recommended:
+                prereqs += [(prereq, 'recommended', None) for prereq in group]
+            elif len(group) > 1:
+                prereqs += [(prereq, 'or', number_of_groups)
+                            for prereq in group]
+                number_of_groups += 1
+            else:
+                prereqs.append((group[0], 'required', None))
+    return tuple(prereqs), current_dept
+
+
+def get_course_prereqs(k, rline):
+    """
+    This function returns a list of (prereq, course, kind, group) tuples for
+    the courses named in every requisite line in rline, the list of
+    requisite lines of the course coded k.  kind is one of PREREQ_KINDS:
+    'recommended' for courses named in a clause recommending them, 'or' for
+    courses named as alternatives to each other (PHYS 117 or 124, BIOL
+    230/ENST 210, BIOL 181, 230, or 281, one of the following: BIOL 241,
+    251, 291), and 'required' otherwise.  group numbers the groups of
+    alternatives of the course, from 0, so that the alternatives of each
+    group can be told from those of another (None if kind is not 'or').
+    Course numbers without a department take the last department named, or
+    else k's own department.  Each prereq is listed once.
+    """
+    course_prereqs = []
+    seen = set([k])
+    group_ids = {}
+    # assume a course is most likely to require another in its own
+    # department
+    current_dept = k[0:4]
+    for line in enumerate(rline):
+        prereqs, current_dept = read_requisite_line(line[1], current_dept)
+        for prereq, kind, group in prereqs:
+            if prereq not in seen:
+                seen.add(prereq)
+                if group is not None:
+                    group = group_ids.setdefault((line[0], group),
+                                                 len(group_ids))
+                course_prereqs.append((prereq, k, kind, group))
+    return course_prereqs
+
+
+@instrumented
+def get_prereqs(course_details):
+    """
+    This function creates an edgelist, prereqs, of (prereq, course, kind,
+    group) tuples for the courses named in every course's online requisite
+    lines, as described in get_course_prereqs, in a single pass over the
+    catalog.
+    """
+    prereqs = []
+    for k in course_details.keys():
+        prereqs += get_course_prereqs(k, course_details[k]["rline"])
+    return prereqs
+
+
+@instrumented
+def test_prereqs(prereqs, course_details):
+    """
+    This function tests the edgelist of prereq relationships, displaying lines
+    explaining requirements which do not contain any course numbers
+    """
+    targets = [pair[1] for pair in prereqs]
+    for k in course_details.keys():
+        if k not in targets:
+            if len(course_details[k]["rline"]) > 0:
+                print(course_details[k]["rline"])
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+The reachability index of the prerequisite graph: every course's full
+chain of prerequisites, and every course it leads to, computed once per
+build so that questions like "what do I need before MATH-355?" are answered
+without searching the graph.  Courses which require each other (a cycle in
+the catalog) are collapsed into one component first, so every course of a
+cycle counts as a prerequisite of the others.  Only the prerequisites a
+course needs are followed: 'required' edges and 'or' edges, every
+alternative of which is listed, as any one of them may be the one taken;
+'recommended' edges are left out.
+
+The index of a graph built from the course database can be made without
+crawling, e.g.
+    graph = make_course_graph(load_course_details(connection, semesters),
+                              load_prereqs(connection, codes))
+    get_all_prerequisites(make_reachability_index(graph), 'MATH-355')
+"""
+
+from .report import instrumented
+
+# whether the export stage builds the index and exports each department's
+# chains in data.json, for the viewer to highlight
+EXPORT_REACHABILITY = True
+# the kinds of prerequisite edges (see PREREQ_KINDS) the index follows
+REACHABILITY_KINDS = ('required', 'or')
+
+
+def iter_bits(bits):
+    "yields the positions of the set bits of an integer, lowest first"
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+@instrumented
+def make_reachability_index(graph):
+    """
+    returns the reachability index of a prerequisite graph, a dictionary
+    of the graph's vertex "names" and "name_index", each vertex's strongly
+    connected component ("membership"), and, for each component, bitsets of
+    the vertex ids in it ("members"), of those it requires ("ancestors") and
+    of those requiring it ("descendants"), following only the edges whose
+    "kind" is in REACHABILITY_KINDS (every edge if the graph's edges have
+    no kinds).  The bitsets are integers whose bit i is set for vertex i,
+    and are built in one pass over the components in topological order.
+    """
+    if "kind" in graph.es.attributes():
+        graph = graph.subgraph_edges(graph.es.select(
+            kind_in=REACHABILITY_KINDS), delete_vertices=False)
+    components = graph.connected_components(mode='strong')
+    membership = components.membership
+    members = [0] * len(components)
+    for vertex_id, component in enumerate(membership):
+        members[component] |= 1 << vertex_id
+
+    # the condensed graph of the components, and its topological order
+    parents = [set() for component in members]
+    children = [set() for component in members]
+    for source, target in graph.get_edgelist():
+        if membership[source] != membership[target]:
+            parents[membership[target]].add(membership[source])
+            children[membership[source]].add(membership[target])
+    in_degrees = [len(component_parents) for component_parents in parents]
+    order = [component for component, in_degree in enumerate(in_degrees)
+             if in_degree == 0]
+    for component in order:
+        for child in children[component]:
+            in_degrees[child] -= 1
+            if in_degrees[child] == 0:
+                order.append(child)
+
+    ancestors = [0] * len(components)
+    for component in order:
+        for parent in parents[component]:
+            ancestors[component] |= ancestors[parent] | members[parent]
+    descendants = [0] * len(components)
+    for component in reversed(order):
+        for child in children[component]:
+            descendants[component] |= descendants[child] | members[child]
+
+    names = graph.vs["name"]
+    return {"names": names,
+            "name_index": {name: vertex_id for vertex_id, name
+                           in enumerate(names)},
+            "membership": membership,
+            "members": members,
+            "ancestors": ancestors,
+            "descendants": descendants}
+
+
+def add_reachability_index(graph):
+    "stores the reachability index of a graph as its attribute 'reachability'"
+    graph["reachability"] = make_reachability_index(graph)
+
+
+def get_ancestor_bits(index, vertex_id):
+    """
+    returns the bitset of the vertices a vertex requires, directly or not,
+    including the other courses of its cycle if it is in one
+    """
+    component = index["membership"][vertex_id]
+    return (index["ancestors"][component] | index["members"][component]) & \
+        ~(1 << vertex_id)
+
+
+def get_descendant_bits(index, vertex_id):
+    """
+    returns the bitset of the vertices requiring a vertex, directly or not,
+    including the other courses of its cycle if it is in one
+    """
+    component = index["membership"][vertex_id]
+    return (index["descendants"][component] | index["members"][component]) & \
+        ~(1 << vertex_id)
+
+
+def get_all_prerequisites(index, code):
+    """
+    returns the sorted codes of every course needed before the course code,
+    directly or through other prerequisites, listing every alternative of
+    a choice of courses and leaving out recommended courses
+    """
+    names = index["names"]
+    bits = get_ancestor_bits(index, index["name_index"][code])
+    return sorted(names[vertex_id] for vertex_id in iter_bits(bits))
+
+
+def get_unlocked_courses(index, code):
+    """
+    returns the sorted codes of every course which needs the course code,
+    directly or through other prerequisites
+    """
+    names = index["names"]
+    bits = get_descendant_bits(index, index["name_index"][code])
+    return sorted(names[vertex_id] for vertex_id in iter_bits(bits))
+
+
+def is_prerequisite(index, prereq, code):
+    "returns whether the course prereq is needed, at any remove, before code"
+    name_index = index["name_index"]
+    return bool(get_ancestor_bits(index, name_index[code]) >>
+                name_index[prereq] & 1)
+
+
+def get_cycles(index):
+    """
+    returns the sorted lists of codes of the courses which require each
+    other, one list per cycle
+    """
+    names = index["names"]
+    return sorted(sorted(names[vertex_id] for vertex_id in iter_bits(bits))
+                  for bits in index["members"] if bits & (bits - 1))
+
+
+def get_subgraph_ancestors(subgraph, index):
+    """
+    returns, for each vertex of a department's subgraph, the sorted subgraph
+    vertex ids of the courses of the subgraph it requires at any remove,
+    including through courses outside the subgraph
+    """
+    name_index = index["name_index"]
+    vertex_ids = [name_index[name] for name in subgraph.vs["name"]]
+    subgraph_ids = {vertex_id: subgraph_id for subgraph_id, vertex_id
+                    in enumerate(vertex_ids)}
+    mask = 0
+    for vertex_id in vertex_ids:
+        mask |= 1 << vertex_id
+    return [sorted(subgraph_ids[ancestor] for ancestor
+                   in iter_bits(get_ancestor_bits(index, vertex_id) & mask))
+            for vertex_id in vertex_ids]
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+The compact record of a course in course_details.  A record is read and
+written like the dictionary it replaces, e.g. record["title"], but keeps its
+fields in slots rather than a dictionary of its own: its url as a path
+relative to URL_PREFIX (or whole, if it does not start with it, e.g. the
+url of another institution's catalog), its departments and requisite lines
+as tuples, and every string in the shared STRING_TABLE, so that the
+department strings, titles and descriptions repeated across the courses
+(and semesters) of a large catalog are each held once.
+"""
+
+# the prefix of every course url, which records do not store
+URL_PREFIX = 'http://www.amherst.edu/'
+
+# one copy of every string the records hold, keyed by itself
+STRING_TABLE = {}
+
+
+def share_string(text):
+    """
+    returns the copy of a string kept in STRING_TABLE, as a plain str (not
+    an lxml smart string, which keeps its parsed tree alive)
+    """
+    text = str(text)
+    return STRING_TABLE.setdefault(text, text)
+
+
+def share_strings(texts):
+    "returns a tuple of the shared copies of a sequence of strings"
+    return tuple(share_string(text) for text in texts)
+
+
+class CourseRecord(object):
+    """
+    a course record of course_details, with the keys "url", "departments",
+    "description", "rline", "title" and, once they are set,
+    "related_departments" and "fingerprint"
+    """
+    __slots__ = ('path', 'prefixed', 'departments', 'description', 'rline',
+                 'title', 'related_departments', 'fingerprint')
+    KEYS = ('url', 'departments', 'description', 'rline', 'title',
+            'related_departments', 'fingerprint')
+
+    def __init__(self, url, departments, description, rline, title,
+                 related_departments=None, fingerprint=None):
+        self.related_departments = None
+        self.fingerprint = None
+        self["url"] = url
+        self["departments"] = departments
+        self["description"] = description
+        self["rline"] = rline
+        self["title"] = title
+        if related_departments is not None:
+            self["related_departments"] = related_departments
+        if fingerprint is not None:
+            self["fingerprint"] = fingerprint
+
+    def __getitem__(self, key):
+        if key == 'url':
+            if self.prefixed:
+                return URL_PREFIX + self.path
+            return self.path
+        if key not in self.KEYS or getattr(self, key) is None:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key == 'url':
+            self.prefixed = value.startswith(URL_PREFIX)
+            if self.prefixed:
+                value = value[len(URL_PREFIX):]
+            self.path = share_string(value)
+        elif key in ('departments', 'rline', 'related_departments'):
+            setattr(self, key, share_strings(value))
+        elif key in ('description', 'title'):
+            setattr(self, key, share_string(value))
+        elif key == 'fingerprint':
+            self.fingerprint = value
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.KEYS and (key == 'url' or
+                                     getattr(self, key) is not None)
+
+    def __eq__(self, other):
+        return dict(self.items()) == dict(other.items())
+
+    def __repr__(self):
+        return 'CourseRecord({!r})'.format(dict(self.items()))
+
+    def get(self, key, default=None):
+        "returns the value of a key, or default if the record has none"
+        return self[key] if key in self else default
+
+    def keys(self):
+        "returns the keys the record has, in order"
+        return [key for key in self.KEYS if key in self]
+
+    def items(self):
+        "returns the (key, value) pairs of the record, in order"
+        return [(key, self[key]) for key in self.keys()]
+
+    def pop(self, key, *default):
+        """
+        removes the related departments or fingerprint of the record,
+        returning it (or default if it has none)
+        """
+        if key not in ('related_departments', 'fingerprint'):
+            raise KeyError(key)
+        value = self.get(key, *default) if default else self[key]
+        setattr(self, key, None)
+        return value
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentation of the stages of a build, and the run report and profiles
+it produces.
+"""
+
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .files import write_atomically
+
+# instrumentation: each stage of a run (a function decorated with
+# instrumented) records in RUN_REPORT its wall and CPU time, the HTTP traffic
+# which happened while it ran (requests, bytes, latencies, status codes and
+# response cache hits) and the sizes of its results; the export records the
+# layout time, node and edge counts and bytes written of each department.
+# write_run_report saves RUN_REPORT as json at REPORT_PATH at the end of a
+# run, and PROFILE may be set to 'cprofile' or 'pyinstrument' to profile the
+# run as well, saving the profile beside PROFILE_PATH.
+REPORT_PATH = './run_report.json'
+PROFILE = None
+PROFILE_PATH = './run_profile'
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATS_LOCK = threading.Lock()
+OPEN_STAGES = []
+
+
+def make_http_stats():
+    "returns an empty record of HTTP traffic"
+    return {"requests": 0,
+            "bytes": 0,
+            "statuses": {},
+            "latency_histogram": [0] * (len(LATENCY_BUCKETS) + 1),
+            "cache_hits": 0,
+            "cache_revalidated": 0,
+            "cache_misses": 0,
+            "cache_stale": 0}
+
+
+RUN_REPORT = {}
+
+
+def reset_run_report():
+    """
+    empties RUN_REPORT (in place, so that every module sees the same one)
+    for a new run
+    """
+    with STATS_LOCK:
+        RUN_REPORT.clear()
+        RUN_REPORT.update({"started": time.time(),
+                           "stages": OrderedDict(),
+                           "http": make_http_stats(),
+                           "departments": {}})
+
+
+reset_run_report()
+
+
+def record_http(status=None, size=0, latency=None, cache=None):
+    """
+    adds a request, with its status, body size in bytes and latency in
+    seconds, and the result of its response cache lookup ('hits',
+    'revalidated', 'misses', or 'stale' if the request failed and a stale
+    cached page was used instead) to the HTTP traffic of the run and of
+    every open stage
+    """
+    with STATS_LOCK:
+        for stats in [RUN_REPORT["http"]] + [r["http"] for r in OPEN_STAGES]:
+            if status is not None:
+                stats["requests"] += 1
+                stats["bytes"] += size
+                stats["statuses"][str(status)] = \
+                    stats["statuses"].get(str(status), 0) + 1
+                bucket = sum(latency > bound for bound in LATENCY_BUCKETS)
+                stats["latency_histogram"][bucket] += 1
+            if cache is not None:
+                stats["cache_" + cache] += 1
+
+
+def add_counts(**counts):
+    "adds counts to those of the innermost open stage"
+    with STATS_LOCK:
+        if OPEN_STAGES:
+            record = OPEN_STAGES[-1]
+            for key, value in counts.items():
+                record[key] = record.get(key, 0) + value
+
+
+@contextlib.contextmanager
+def stage(name):
+    """
+    records the time, CPU time (including that of finished worker
+    processes) and HTTP traffic of the code run in this context in the
+    stage of RUN_REPORT called name, adding to it if the stage ran before
+    """
+    with STATS_LOCK:
+        if name not in RUN_REPORT["stages"]:
+            RUN_REPORT["stages"][name] = {"calls": 0,
+                                          "wall_seconds": 0.0,
+                                          "cpu_seconds": 0.0,
+                                          "http": make_http_stats()}
+        record = RUN_REPORT["stages"][name]
+        record["calls"] += 1
+        OPEN_STAGES.append(record)
+    times_0 = os.times()
+    wall_0 = time.perf_counter()
+    cpu_0 = time.process_time() + times_0.children_user + \
+        times_0.children_system
+    try:
+        yield record
+    finally:
+        times_1 = os.times()
+        cpu_1 = time.process_time() + times_1.children_user + \
+            times_1.children_system
+        with STATS_LOCK:
+            record["wall_seconds"] += time.perf_counter() - wall_0
+            record["cpu_seconds"] += cpu_1 - cpu_0
+            OPEN_STAGES.remove(record)
+
+
+def count_results(result):
+    """
+    returns the counts describing a stage's result: the nodes and edges of a
+    graph, or the number of items in a collection
+    """
+    if hasattr(result, 'vcount') and hasattr(result, 'ecount'):
+        return {"nodes": result.vcount(), "edges": result.ecount()}
+    if isinstance(result, (dict, list, tuple, set, frozenset)):
+        return {"results": len(result)}
+    return {}
+
+
+def instrumented(function):
+    "records each call of a stage function in the stage named after it"
+    @functools.wraps(function)
+    def instrumented_function(*args, **kwargs):
+        with stage(function.__name__) as record:
+            result = function(*args, **kwargs)
+            counts = count_results(result)
+            with STATS_LOCK:
+                record.update(counts)
+            return result
+    return instrumented_function
+
+
+def get_cache_hit_ratio(stats):
+    """
+    returns the fraction of response cache lookups answered from the cache
+    (fresh or revalidated), or None if there were none
+    """
+    lookups = stats["cache_hits"] + stats["cache_revalidated"] + \
+        stats["cache_misses"] + stats["cache_stale"]
+    if lookups == 0:
+        return None
+    return (stats["cache_hits"] + stats["cache_revalidated"]) / lookups
+
+
+def write_run_report(path=None, settings=None):
+    """
+    writes RUN_REPORT, with the total time, the cache hit ratios, labelled
+    latency histograms and the settings of the run (a dictionary), as json
+    to path (REPORT_PATH if None)
+    """
+    if path is None:
+        path = REPORT_PATH
+    labels = ['<=' + str(bound) for bound in LATENCY_BUCKETS]
+    labels.append('>' + str(LATENCY_BUCKETS[-1]))
+    report = json.loads(json.dumps(RUN_REPORT))
+    report["wall_seconds"] = time.time() - report["started"]
+    report["settings"] = settings or {}
+    for stats in [report["http"]] + \
+            [record["http"] for record in report["stages"].values()]:
+        stats["cache_hit_ratio"] = get_cache_hit_ratio(stats)
+        stats["latency_histogram"] = OrderedDict(
+            zip(labels, stats["latency_histogram"]))
+    write_atomically(path, json.dumps(report, indent=2).encode('utf-8'))
+
+
+def start_profiler(profile=None):
+    """
+    starts and returns a cProfile or pyinstrument profiler if profile (or
+    PROFILE, if it is None) is 'cprofile' or 'pyinstrument', or returns None
+    """
+    if profile is None:
+        profile = PROFILE
+    if profile == 'cprofile':
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    if profile == 'pyinstrument':
+        import pyinstrument
+        profiler = pyinstrument.Profiler()
+        profiler.start()
+        return profiler
+    return None
+
+
+def stop_profiler(profiler, path=None):
+    """
+    stops a profiler from start_profiler and saves its profile to path
+    (PROFILE_PATH if None) plus '.prof' (cProfile, for pstats or snakeviz)
+    or '.html' (pyinstrument)
+    """
+    if profiler is None:
+        return
+    if path is None:
+        path = PROFILE_PATH
+    if hasattr(profiler, 'dump_stats'):
+        profiler.disable()
+        profiler.dump_stats(path + '.prof')
+    else:
+        profiler.stop()
+        write_atomically(path + '.html',
+                         profiler.output_html().encode('utf-8'))
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+The search index exported beside each data.json as search.json, which the
+network viewer consults rather than scanning every node on each search.  It
+lists the words of each course's code, title and description, sorted, each
+with the ids of the nodes whose course has it, so that the viewer finds the
+courses having a word starting with each word searched by a binary search
+of the words:
+
+    {"titles": ["Calculus", ...],
+     "words": [["111", 0, 4], ["calculus", 0], ...]}
+
+"titles" holds the title of each node, in the order of the node ids, for
+the viewer to list the results by.
+"""
+
+import re
+import unicodedata
+
+# whether the export stage writes search.json beside each data.json
+EXPORT_SEARCH_INDEX = True
+
+# the words of a text are its runs of letters and digits, lowercased with
+# their accents dropped; main.js splits the text searched the same way
+WORD_PATTERN = re.compile(r'[^\W_]+')
+
+
+def get_words(text):
+    "returns the list of the words of a text, as the search index holds them"
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(character for character in text
+                       if not unicodedata.category(character).startswith('M'))
+    return WORD_PATTERN.findall(text.lower())
+
+
+def get_course_words(code, course_details):
+    """
+    returns the set of the words of a course's code (with the code without
+    its hyphen, e.g. 'math111', as a word of its own), title and
+    description, or of its code alone if it has no retrieved details
+    """
+    words = set(get_words(code))
+    words.add(''.join(get_words(code)))
+    if code in course_details.keys():
+        words.update(get_words(course_details[code]["title"]))
+        words.update(get_words(course_details[code]["description"]))
+    return words
+
+
+def make_search_index(names, course_details):
+    """
+    returns the titles and words of the search index of the nodes of a
+    subgraph, given the course codes of its vertices (subgraph.vs["name"])
+    """
+    titles = []
+    word_ids = {}
+    for node_id, code in enumerate(names):
+        if code in course_details.keys():
+            titles.append(course_details[code]["title"])
+        else:
+            titles.append(code)
+        for word in get_course_words(code, course_details):
+            word_ids.setdefault(word, []).append(node_id)
+    # sorted by utf-16 code units, as javascript compares strings
+    words = [[word] + word_ids[word] for word
+             in sorted(word_ids, key=lambda word: word.encode('utf-16-be'))]
+    return titles, words
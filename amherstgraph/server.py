@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+A local HTTP service which renders arbitrary views of the prerequisite
+network on request, rather than only the departments exported as static
+files: several departments at once (a major and a minor), or the courses
+within some number of prerequisites of particular courses.  It keeps
+course_details and the prerequisite graph of the last build in memory, and
+the payloads it renders in an LRU cache bounded by VIEW_CACHE_BYTES.
+
+    GET /data.json?dept=mathematics,PHYS&course=COSC-111&hops=2
+        the data json object of a view, as export_json writes it but with
+        the course attributes inline
+    GET /search.json?dept=mathematics,PHYS&course=COSC-111&hops=2
+        the search index of the same view, as export_json writes it
+    GET /view/<query>/
+        the network viewer showing the view of the query string <query>,
+        e.g. /view/dept=MATH&dept=ECON/
+    GET /stats
+        the counts of the view cache
+
+usage: python -m amherstgraph.server [--host HOST] [--port PORT]
+                                     [--cache-mb MB]
+"""
+
+import argparse
+import asyncio
+import json
+import mimetypes
+import os
+import sys
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote
+
+from .departments import get_dept_strings
+from .export import encode_json, make_json_parts
+from .search import make_search_index
+
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8008
+
+# the rendered payloads are kept, most recently used last, until their
+# total size passes VIEW_CACHE_BYTES; the largest neighborhood a view may
+# ask for is MAX_HOPS prerequisites from its courses
+VIEW_CACHE_BYTES = 64 * 2**20
+MAX_HOPS = 4
+
+# the network viewer served under /view/, the template of the exports
+VIEWER_DIR = './NetworkTemplateWithoutData_JSON'
+
+SERVER_STATE = {}
+VIEW_CACHE = OrderedDict()
+VIEW_CACHE_STATS = {"hits": 0, "misses": 0, "evictions": 0, "bytes": 0,
+                    "render_seconds": 0.0}
+PENDING_VIEWS = {}
+
+# views are rendered one at a time on a thread of their own, so the event
+# loop keeps answering cached views while one renders
+RENDER_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+
+STATUS_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+                  405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+def load_server_state():
+    """
+    loads course_details and the prerequisite graph of the last build into
+    SERVER_STATE
+    """
+    from .pipeline import load_course_graph
+    course_details, complete_course_graph = load_course_graph()
+    SERVER_STATE["course_details"] = course_details
+    SERVER_STATE["complete_course_graph"] = complete_course_graph
+
+
+def get_view(query):
+    """
+    returns the view a query string asks for, a tuple of its sorted
+    department strings, its sorted course codes and its number of hops,
+    which is also its key in the view cache; raises a ValueError naming
+    anything it does not know
+    """
+    params = parse_qs(query)
+    names = [name for value in params.get('dept', [])
+             for name in value.split(',') if name]
+    codes = set(code.upper() for value in params.get('course', [])
+                for code in value.split(',') if code)
+    dept_strings = get_dept_strings(names) or []
+    name_index = SERVER_STATE["complete_course_graph"]["name_index"]
+    for code in codes:
+        if code not in name_index:
+            raise ValueError('unknown course: ' + code)
+    try:
+        hops = int(params.get('hops', ['1'])[0])
+    except ValueError:
+        raise ValueError('hops is not a number')
+    if not 1 <= hops <= MAX_HOPS:
+        raise ValueError('hops must be from 1 to {}'.format(MAX_HOPS))
+    if not dept_strings and not codes:
+        raise ValueError('a view needs a dept or a course')
+    return (tuple(sorted(dept_strings)), tuple(sorted(codes)),
+            hops if codes else 1)
+
+
+def render_view(view, kind='data'):
+    """
+    returns the data json object of a view, or its search index if kind is
+    'search', encoded
+    """
+    from .graph import make_view_subgraph
+    dept_strings, codes, hops = view
+    course_details = SERVER_STATE["course_details"]
+    complete_course_graph = SERVER_STATE["complete_course_graph"]
+    subgraph = make_view_subgraph(complete_course_graph, course_details,
+                                  dept_strings, codes, hops)
+    if kind == 'search':
+        titles, words = make_search_index(subgraph.vs["name"], course_details)
+        return encode_json({"titles": titles, "words": words})
+    nodes, edges = make_json_parts(None, course_details,
+                                   complete_course_graph, subgraph)
+    return b''.join([b'{"nodes":[', b','.join(map(encode_json, nodes)),
+                     b'],"edges":[', b','.join(map(encode_json, edges)),
+                     b']}'])
+
+
+def cache_view(key, payload):
+    """
+    stores a rendered payload in the view cache under its key, (kind, view),
+    evicting the least recently used payloads until the cache fits in
+    VIEW_CACHE_BYTES
+    """
+    if len(payload) > VIEW_CACHE_BYTES:
+        return
+    VIEW_CACHE[key] = payload
+    VIEW_CACHE_STATS["bytes"] += len(payload)
+    while VIEW_CACHE_STATS["bytes"] > VIEW_CACHE_BYTES:
+        evicted_key, evicted = VIEW_CACHE.popitem(last=False)
+        VIEW_CACHE_STATS["bytes"] -= len(evicted)
+        VIEW_CACHE_STATS["evictions"] += 1
+
+
+async def get_view_payload(view, kind='data'):
+    """
+    returns the payload of a view (its data json object, or its search index
+    if kind is 'search') from the view cache, or renders and caches it;
+    requests for a payload already being rendered wait for that rendering
+    """
+    key = (kind, view)
+    payload = VIEW_CACHE.get(key)
+    if payload is not None:
+        VIEW_CACHE.move_to_end(key)
+        VIEW_CACHE_STATS["hits"] += 1
+        return payload
+    if key in PENDING_VIEWS:
+        return await asyncio.shield(PENDING_VIEWS[key])
+    VIEW_CACHE_STATS["misses"] += 1
+    time_0 = time.perf_counter()
+    future = asyncio.get_running_loop().run_in_executor(
+        RENDER_EXECUTOR, render_view, view, kind)
+    PENDING_VIEWS[key] = future
+    try:
+        payload = await asyncio.shield(future)
+    finally:
+        del PENDING_VIEWS[key]
+    VIEW_CACHE_STATS["render_seconds"] += time.perf_counter() - time_0
+    cache_view(key, payload)
+    return payload
+
+
+def read_viewer_file(path):
+    """
+    returns the content type and bytes of a file of the network viewer, or
+    None if there is no such file
+    """
+    root = os.path.abspath(VIEWER_DIR)
+    full_path = os.path.abspath(os.path.join(root, path or 'index.html'))
+    if not full_path.startswith(root + os.sep) or \
+            not os.path.isfile(full_path):
+        return None
+    with open(full_path, 'rb') as viewer_file:
+        data = viewer_file.read()
+    return mimetypes.guess_type(full_path)[0] or 'application/octet-stream', \
+        data
+
+
+async def respond(method, target):
+    """
+    returns the status, content type and body of the response to a request
+    """
+    if method not in ('GET', 'HEAD'):
+        return 405, 'text/plain', b'only GET and HEAD are supported\n'
+    path, _, query = target.partition('?')
+    path = unquote(path)
+    if path.startswith('/view/'):
+        view_query, _, path = path[len('/view/'):].partition('/')
+        if path in ('data.json', 'search.json'):
+            query = view_query
+            path = '/' + path
+        else:
+            viewer_file = read_viewer_file(path)
+            if viewer_file is None:
+                return 404, 'text/plain', b'not found\n'
+            return (200,) + viewer_file
+    elif path == '/stats':
+        stats = dict(VIEW_CACHE_STATS, views=len(VIEW_CACHE),
+                     pending=len(PENDING_VIEWS))
+        return 200, 'application/json', json.dumps(stats).encode('utf-8')
+    elif path not in ('/data.json', '/search.json'):
+        return 404, 'text/plain', b'not found\n'
+    try:
+        view = get_view(query)
+    except ValueError as error:
+        return 400, 'text/plain', (str(error) + '\n').encode('utf-8')
+    return 200, 'application/json', \
+        await get_view_payload(view, path[1:-len('.json')])
+
+
+async def handle_connection(reader, writer):
+    """
+    answers the requests of one connection, keeping it open between them as
+    HTTP/1.1 allows
+    """
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            try:
+                method, target, version = \
+                    request_line.decode('latin-1').split()
+            except ValueError:
+                method, target, version = None, None, 'HTTP/1.0'
+                status, content_type, body = 400, 'text/plain', \
+                    b'bad request\n'
+            else:
+                try:
+                    status, content_type, body = await respond(method,
+                                                               target)
+                except Exception:
+                    traceback.print_exc()
+                    status, content_type, body = 500, 'text/plain', \
+                        b'internal error\n'
+            keep_alive = version == 'HTTP/1.1' and \
+                headers.get('connection', '').lower() != 'close'
+            head = 'HTTP/1.1 {} {}\r\nContent-Type: {}\r\n' \
+                'Content-Length: {}\r\nConnection: {}\r\n\r\n'.format(
+                    status, STATUS_REASONS[status], content_type, len(body),
+                    'keep-alive' if keep_alive else 'close')
+            writer.write(head.encode('latin-1'))
+            if method != 'HEAD':
+                writer.write(body)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host=None, port=None):
+    """
+    serves views on host and port (SERVER_HOST and SERVER_PORT if None)
+    until cancelled
+    """
+    if host is None:
+        host = SERVER_HOST
+    if port is None:
+        port = SERVER_PORT
+    server = await asyncio.start_server(handle_connection, host, port)
+    address = server.sockets[0].getsockname()
+    print('serving on http://{}:{}/'.format(address[0], address[1]),
+          flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    "loads the last build and serves views of it"
+    global VIEW_CACHE_BYTES
+    parser = argparse.ArgumentParser(
+        prog='python -m amherstgraph.server',
+        description='Serves views of the prerequisite network of the last '
+        'build, rendered on request.')
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT,
+                        help='the port to listen on (0 for any free one)')
+    parser.add_argument('--cache-mb', type=float,
+                        default=VIEW_CACHE_BYTES / 2**20,
+                        help='the size of the view cache in megabytes')
+    args = parser.parse_args(argv)
+    VIEW_CACHE_BYTES = int(args.cache_mb * 2**20)
+    load_server_state()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+Fetching pages: a shared, bounded connection pool, a response cache on disk
+revalidated with ETag/Last-Modified, and concurrent fetching of many urls.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import urllib3 as ul
+
+from .files import write_atomically
+from .report import instrumented, record_http
+
+# crawler settings: MAX_WORKERS bounds the number of pages in flight at once,
+# MAX_PER_HOST bounds the number of open connections to any one host (the
+# connection pools block rather than open more), and failed requests are
+# retried RETRIES times with exponential backoff
+MAX_WORKERS = 16
+MAX_PER_HOST = 8
+RETRIES = 4
+BACKOFF = 0.5
+
+# response cache settings: pages fetched less than CACHE_TTL seconds ago are
+# served from CACHE_DIR without a request, older ones are revalidated with
+# their ETag/Last-Modified, and prune_cache() drops entries unused for
+# CACHE_MAX_AGE seconds and then the least recently used ones until the cache
+# fits in CACHE_MAX_BYTES.  With OFFLINE set, every page must come from the
+# cache and nothing is requested.
+CACHE_DIR = './.http_cache'
+CACHE_TTL = 24 * 3600
+CACHE_MAX_AGE = 90 * 24 * 3600
+CACHE_MAX_BYTES = 512 * 2**20
+OFFLINE = False
+
+# HOST_OVERRIDES maps a host name to the scheme and host to request its urls
+# from instead, e.g. {"www.amherst.edu": "http://127.0.0.1:8000"}, so that a
+# crawl can run against a local stand-in for the catalog.  It is read from the
+# AMHERSTGRAPH_HOST_OVERRIDES environment variable, as json, if that is set.
+# Pages are still cached under their original urls.
+HOST_OVERRIDES = json.loads(os.environ.get('AMHERSTGRAPH_HOST_OVERRIDES',
+                                           '{}'))
+
+HTTP = None
+HTTP_LOCK = threading.Lock()
+
+
+def get_http():
+    """
+    returns the connection pool shared by every request, making it (and
+    silencing urllib3's warnings) the first time a page is requested
+    """
+    global HTTP
+    with HTTP_LOCK:
+        if HTTP is None:
+            ul.disable_warnings()
+            HTTP = ul.PoolManager(maxsize=MAX_PER_HOST, block=True,
+                                  retries=ul.Retry(total=RETRIES,
+                                                   backoff_factor=BACKOFF,
+                                                   status_forcelist=(
+                                                       429, 500, 502, 503,
+                                                       504)))
+    return HTTP
+
+
+def get_cache_paths(url):
+    """
+    returns the paths of the cache entry describing a url and of the
+    directory holding the cached bodies, which are named by their sha256
+    """
+    key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    entry_path = os.path.join(CACHE_DIR, 'entries', key + '.json')
+    return entry_path, os.path.join(CACHE_DIR, 'bodies')
+
+
+def get_request_url(url):
+    """
+    returns the url to request for a url, with its host replaced as
+    HOST_OVERRIDES says
+    """
+    address = url.split('://', 1)[-1]
+    host = address.split('/', 1)[0]
+    if host in HOST_OVERRIDES:
+        return HOST_OVERRIDES[host] + address[len(host):]
+    return url
+
+
+def read_cache(url):
+    """
+    returns a tuple (entry, body) for a cached url, or (None, None) if the
+    url has not been cached or its body has since been evicted
+    """
+    entry_path, bodies = get_cache_paths(url)
+    try:
+        with open(entry_path) as entry_file:
+            entry = json.load(entry_file)
+        with open(os.path.join(bodies, entry["digest"]), 'rb') as body_file:
+            body = body_file.read()
+    except (OSError, ValueError, KeyError):
+        return None, None
+    # mark the entry as recently used for eviction
+    os.utime(entry_path)
+    return entry, body
+
+
+def write_cache(url, response, body):
+    """
+    stores a response body under its sha256 and records the url's entry
+    with the validators needed to revalidate it later
+    """
+    entry_path, bodies = get_cache_paths(url)
+    digest = hashlib.sha256(body).hexdigest()
+    body_path = os.path.join(bodies, digest)
+    if not os.path.exists(body_path):
+        write_atomically(body_path, body)
+    entry = {"url": url,
+             "digest": digest,
+             "etag": response.headers.get('ETag'),
+             "last_modified": response.headers.get('Last-Modified'),
+             "fetched": time.time()}
+    write_atomically(entry_path, json.dumps(entry).encode('utf-8'))
+
+
+def fetch(url):
+    """
+    fetches a single url through the shared connection pool and the response
+    cache, returning the body of the response as bytes.  In OFFLINE mode a
+    url missing from the cache raises a KeyError.  A request which fails, or
+    whose response has an error status (4xx or 5xx), returns the cached body
+    if the url has been cached, however stale, and otherwise raises a
+    urllib3 HTTPError; an error page is never returned or cached as the
+    url's body.
+    """
+    entry, body = read_cache(url)
+    if entry is not None:
+        if OFFLINE or time.time() - entry["fetched"] < CACHE_TTL:
+            record_http(cache='hits')
+            return body
+    elif OFFLINE:
+        record_http(cache='misses')
+        raise KeyError(url + ' is not in the response cache')
+
+    # revalidate a stale entry rather than downloading it again
+    headers = {}
+    if entry is not None:
+        if entry["etag"]:
+            headers['If-None-Match'] = entry["etag"]
+        if entry["last_modified"]:
+            headers['If-Modified-Since'] = entry["last_modified"]
+    time_0 = time.perf_counter()
+    try:
+        response = get_http().request("GET", get_request_url(url),
+                                      headers=headers)
+    except ul.exceptions.HTTPError as error:
+        if entry is None:
+            raise
+        print('{} failed ({}); using the cached page'.format(url, error))
+        record_http(cache='stale')
+        return body
+    latency = time.perf_counter() - time_0
+    if response.status == 304 and entry is not None:
+        record_http(response.status, 0, latency, 'revalidated')
+        entry["fetched"] = time.time()
+        write_atomically(get_cache_paths(url)[0],
+                         json.dumps(entry).encode('utf-8'))
+        return body
+    if response.status >= 400 and entry is not None:
+        record_http(response.status, len(response.data), latency, 'stale')
+        print('{} returned HTTP {}; using the cached page'.format(
+            url, response.status))
+        return body
+    record_http(response.status, len(response.data), latency, 'misses')
+    if response.status >= 400:
+        raise ul.exceptions.HTTPError('{} returned HTTP {}'.format(
+            url, response.status))
+    if response.status == 200:
+        write_cache(url, response, response.data)
+    return response.data
+
+
+@instrumented
+def prune_cache(max_age=None, max_bytes=None):
+    """
+    evicts cache entries unused for max_age seconds (CACHE_MAX_AGE if None),
+    then the least recently used entries until the cached bodies fit in
+    max_bytes (CACHE_MAX_BYTES if None), and finally deletes the bodies no
+    remaining entry refers to
+    """
+    if max_age is None:
+        max_age = CACHE_MAX_AGE
+    if max_bytes is None:
+        max_bytes = CACHE_MAX_BYTES
+    entries_dir = os.path.join(CACHE_DIR, 'entries')
+    bodies_dir = os.path.join(CACHE_DIR, 'bodies')
+    if not os.path.exists(entries_dir):
+        return
+
+    # read every entry, most recently used first
+    entries = []
+    for name in os.listdir(entries_dir):
+        path = os.path.join(entries_dir, name)
+        try:
+            with open(path) as entry_file:
+                digest = json.load(entry_file)["digest"]
+            size = os.path.getsize(os.path.join(bodies_dir, digest))
+            entries.append((os.path.getmtime(path), path, digest, size))
+        except (OSError, ValueError, KeyError):
+            os.remove(path)
+    entries.sort(reverse=True)
+
+    # keep entries while they are young enough and fit, counting each
+    # shared body once
+    kept_digests = set()
+    total_bytes = 0
+    now = time.time()
+    for used, path, digest, size in entries:
+        if digest not in kept_digests:
+            new_total = total_bytes + size
+        else:
+            new_total = total_bytes
+        if now - used > max_age or new_total > max_bytes:
+            os.remove(path)
+        else:
+            kept_digests.add(digest)
+            total_bytes = new_total
+
+    for digest in os.listdir(bodies_dir):
+        if digest not in kept_digests:
+            os.remove(os.path.join(bodies_dir, digest))
+
+
+def fetch_all(urls, max_workers=None):
+    """
+    fetches many urls concurrently, max_workers at a time (MAX_WORKERS if
+    None), yielding (url, data) tuples in the same order as urls. A url
+    whose request fails yields its exception in place of the data, so one
+    bad page does not stop the crawl.
+    """
+    if max_workers is None:
+        max_workers = MAX_WORKERS
+    def fetch_or_error(url):
+        try:
+            return fetch(url)
+        except Exception as error:
+            return error
+
+    urls = list(urls)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for url, data in zip(urls, executor.map(fetch_or_error, urls)):
+            yield url, data
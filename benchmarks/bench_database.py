@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Times the course database on synthetic catalogs of growing size: recording
+the catalogs with write_catalog, then the queries get_latest_offerings and
+get_department_courses.  The department query only reads the department's
+listings, through the indexes, so it should take milliseconds and grow with
+the department rather than with the whole history in the database.
+
+usage: python benchmarks/bench_database.py [largest number of urls]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from synthetic import make_course_urls
+import amherstgraph
+
+
+def get_catalog_urls(course_urls):
+    "returns the urls of the catalogs which list the urls in course_urls"
+    return sorted(set(
+        'www.amherst.edu/academiclife/departments/{}/courses/{}'.format(
+            dept, url[len(url) - 5:])
+        for dept, urls in course_urls.items() for url in urls))
+
+
+def time_call(function, *args):
+    """
+    returns the result and the best wall-clock time of three calls of
+    function(*args)
+    """
+    best = None
+    for _ in range(3):
+        time_0 = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - time_0
+        if best is None or elapsed < best:
+            best = elapsed
+    return result, best
+
+
+def main(largest=100000):
+    print('{:>8} {:>10} {:>12} {:>12} {:>12}'.format(
+        'urls', 'write (s)', 'latest (s)', 'dept (ms)', 'courses'))
+    directory = tempfile.mkdtemp(prefix='amherstgraph-bench-')
+    try:
+        for size in [largest // 8, largest // 4, largest // 2, largest]:
+            course_urls = make_course_urls(size)
+            connection = amherstgraph.connect_database(
+                os.path.join(directory, '{}.sqlite'.format(size)))
+            time_0 = time.perf_counter()
+            amherstgraph.write_catalog(connection,
+                                       get_catalog_urls(course_urls),
+                                       course_urls, {})
+            write = time.perf_counter() - time_0
+            latest = time_call(amherstgraph.get_latest_offerings,
+                               connection)[1]
+            codes, dept = time_call(amherstgraph.get_department_courses,
+                                    connection, 'MATH', 2013, 2015)
+            connection.close()
+            print('{:>8} {:>10.3f} {:>12.3f} {:>12.2f} {:>12}'.format(
+                size, write, latest, 1e3 * dept, len(codes)))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Times get_most_recent_course_urls and the url -> departments index used by
+get_course_info on synthetic catalogs of growing size.  Both should scale
+near-linearly: the time per url should stay roughly flat as the catalog
+grows to 100k course urls.
+
+usage: python benchmarks/bench_indexes.py [largest number of urls]
+"""
+
+import sys
+import time
+
+from synthetic import make_course_urls
+import amherstgraph
+
+
+def time_call(function, *args):
+    "returns the best wall-clock time of three calls of function(*args)"
+    best = None
+    for _ in range(3):
+        time_0 = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - time_0
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main(largest=100000):
+    print('{:>8} {:>12} {:>12} {:>12} {:>12}'.format(
+        'urls', 'recent (s)', 'us/url', 'index (s)', 'us/url'))
+    sizes = [largest // 8, largest // 4, largest // 2, largest]
+    for size in sizes:
+        course_urls = make_course_urls(size)
+        recent = time_call(amherstgraph.get_most_recent_course_urls,
+                           course_urls)
+        index = time_call(amherstgraph.get_url_departments, course_urls)
+        print('{:>8} {:>12.3f} {:>12.2f} {:>12.3f} {:>12.2f}'.format(
+            size, recent, 1e6 * recent / size, index, 1e6 * index / size))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
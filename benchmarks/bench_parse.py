@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Measures pages per second and peak RSS of reading course pages, comparing
+parse_course_page, the incremental single-pass reader get_course_info uses,
+with building each page's whole tree and evaluating string xpaths as
+get_course_info used to.  Each reader runs in its own process so that its
+peak RSS is its own.
+
+The corpus is every file in a directory of saved course pages (the bodies
+directory of the response cache works), or synthetic pages by default.
+
+usage: python benchmarks/bench_parse.py [corpus directory]
+"""
+
+import io
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from lxml import html
+
+from synthetic import make_course_pages
+import amherstgraph
+
+
+def read_with_tree(data):
+    "reads a course page the way get_course_info used to"
+    path = '//*[@id="academics-course-list"]/p/text()'
+    tree = html.parse(io.BytesIO(data))
+    texts = tree.xpath(path)
+    title = tree.xpath('//*[@id="academics-course-list"]/h2/text()')
+    return [str(t) for t in texts], (str(title[0]) if title else None)
+
+
+READERS = {"tree": read_with_tree,
+           "pull": amherstgraph.parse_course_page}
+
+
+def load_corpus(directory=None):
+    "returns the pages of the corpus as a list of bytes"
+    if directory is None:
+        return make_course_pages(500)
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), 'rb') as page_file:
+            pages.append(page_file.read())
+    return pages
+
+
+def run_reader(reader, directory=None, rounds=3):
+    """
+    reads the corpus rounds times with one reader, printing the pages per
+    second of the best round and the peak RSS of this process
+    """
+    pages = load_corpus(directory)
+    results = []
+    best = None
+    for _ in range(rounds):
+        time_0 = time.perf_counter()
+        results = [READERS[reader](page) for page in pages]
+        elapsed = time.perf_counter() - time_0
+        if best is None or elapsed < best:
+            best = elapsed
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print('{:>6} {:>10.0f} {:>14.1f} {:>10}'.format(
+        reader, len(pages) / best, peak_rss / 1024., hash(repr(results))))
+
+
+def main(directory=None):
+    print('{:>6} {:>10} {:>14} {:>10}'.format(
+        'reader', 'pages/s', 'peak RSS (MB)', 'checksum'))
+    for reader in READERS:
+        command = [sys.executable, os.path.abspath(__file__),
+                   '--reader', reader]
+        if directory is not None:
+            command.append(directory)
+        subprocess.run(command, check=True,
+                       env=dict(os.environ, PYTHONHASHSEED='0'))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == '--reader':
+        run_reader(*sys.argv[2:])
+    else:
+        main(*sys.argv[1:])
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the crawl, parsing, graph building and export against the local
+stand-in catalog of catalog_server.py, so no request reaches amherst.edu.
+At each scale (1 is the size of the real catalog) it times every stage in
+isolation, in process and with a cold response cache, then the warm-cache
+crawl of the course pages, then the whole pipeline as `python -m
+amherstgraph` runs it, each in a fresh directory and keeping the best of the
+rounds.
+
+The times are compared with the baselines stored in baselines.json for the
+same scale: any more than TOLERANCE slower (and by more than MIN_SLOWDOWN
+seconds) is a regression, and the benchmark exits with status 1 after
+listing them.  Baselines are only meaningful on the machine they were
+recorded on; --update-baseline records the times measured as the new
+baselines.
+
+usage: python benchmarks/bench_pipeline.py [--scale S ...] [--rounds N]
+                                           [--jobs N] [--update-baseline]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+from catalog_server import start_server
+import amherstgraph
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              'baselines.json')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOLERANCE = 0.5
+MIN_SLOWDOWN = 0.05
+
+
+def time_stage(times, name, function, *args, **kwargs):
+    "calls function, storing the seconds it took in times under name"
+    time_0 = time.perf_counter()
+    result = function(*args, **kwargs)
+    times[name] = time.perf_counter() - time_0
+    return result
+
+
+def run_stages(jobs):
+    """
+    runs the pipeline stage by stage in the current directory, returning a
+    dictionary of the seconds each stage took and one of the sizes of the
+    catalog it built
+    """
+    amherstgraph.read_requisite_line.cache_clear()
+    times = OrderedDict()
+    catalog_urls = time_stage(times, 'catalog_urls', lambda: amherstgraph.
+                              get_date(amherstgraph.get_catalog_urls()))
+    catalog_pages = time_stage(times, 'catalog_pages',
+                               amherstgraph.get_catalog_pages, catalog_urls)
+    course_urls = time_stage(times, 'courses', amherstgraph.get_courses,
+                             catalog_urls, catalog_pages=catalog_pages)
+    related_courses = time_stage(times, 'related_courses',
+                                 amherstgraph.get_related_courses,
+                                 catalog_urls, catalog_pages=catalog_pages)
+    recent_urls = time_stage(times, 'recent_urls',
+                             amherstgraph.get_most_recent_course_urls,
+                             course_urls)
+    course_details = time_stage(times, 'course_info',
+                                amherstgraph.get_course_info, recent_urls,
+                                course_urls)
+    time_stage(times, 'course_info_cached', amherstgraph.get_course_info,
+               recent_urls, course_urls)
+    amherstgraph.add_related_departments(course_details, related_courses)
+    prereqs = time_stage(times, 'prereqs', amherstgraph.get_prereqs,
+                         course_details)
+    graph = time_stage(times, 'graph', amherstgraph.make_course_graph,
+                       course_details, prereqs)
+    subgraphs = time_stage(times, 'subgraphs', amherstgraph.make_subgraphs,
+                           amherstgraph.DEPT_CODES.keys(), course_details,
+                           graph)
+    errors = time_stage(times, 'export', amherstgraph.export_departments,
+                        subgraphs, course_details, graph, jobs)
+    if errors:
+        raise RuntimeError('export failed: ' + ', '.join(errors))
+    sizes = {"course pages": len(recent_urls),
+             "nodes": graph.vcount(),
+             "edges": graph.ecount()}
+    return times, sizes
+
+
+def run_pipeline(server_url):
+    """
+    runs `python -m amherstgraph` in the current directory, returning its
+    seconds
+    """
+    env = dict(os.environ, AMHERSTGRAPH_HOST_OVERRIDES=json.dumps(
+        {"www.amherst.edu": server_url}),
+               PYTHONPATH=os.pathsep.join([ROOT] + os.environ.get(
+                   'PYTHONPATH', '').split(os.pathsep)).rstrip(os.pathsep))
+    time_0 = time.perf_counter()
+    subprocess.run([sys.executable, '-m', 'amherstgraph'], env=env,
+                   check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - time_0
+
+
+def in_fresh_directory(function, *args):
+    """
+    calls function in a new empty working directory, so that it starts
+    with no caches, manifest or exports, and deletes the directory after
+    """
+    directory = tempfile.mkdtemp(prefix='amherstgraph-bench-')
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        return function(*args)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory)
+
+
+def measure(scale, rounds, jobs):
+    """
+    returns the best seconds of each stage and of the whole pipeline over
+    rounds rounds at a scale, and the sizes of the catalog
+    """
+    process, server_url = start_server(scale)
+    amherstgraph.web.HOST_OVERRIDES["www.amherst.edu"] = server_url
+    # import every stage's modules before any is timed
+    for submodule in amherstgraph.SUBMODULE_NAMES:
+        getattr(amherstgraph, submodule)
+    best = OrderedDict()
+    try:
+        for _ in range(rounds):
+            times, sizes = in_fresh_directory(run_stages, jobs)
+            times["pipeline"] = in_fresh_directory(run_pipeline, server_url)
+            for name, seconds in times.items():
+                best[name] = min(seconds, best.get(name, seconds))
+    finally:
+        process.terminate()
+    return best, sizes
+
+
+def load_baselines(path=BASELINES_PATH):
+    "returns the stored baselines, a dictionary of times by scale"
+    if not os.path.exists(path):
+        return {}
+    with open(path) as baselines_file:
+        return json.load(baselines_file)
+
+
+def compare(times, baseline):
+    """
+    prints each time beside its baseline and returns the names of the
+    stages which regressed
+    """
+    regressions = []
+    print('{:>20} {:>10} {:>10} {:>8}'.format('stage', 'seconds',
+                                              'baseline', 'ratio'))
+    for name, seconds in times.items():
+        base = baseline.get(name)
+        if base is None:
+            print('{:>20} {:>10.3f} {:>10} {:>8}'.format(name, seconds, '-',
+                                                         '-'))
+            continue
+        regressed = seconds > base * (1 + TOLERANCE) and \
+            seconds - base > MIN_SLOWDOWN
+        print('{:>20} {:>10.3f} {:>10.3f} {:>8.2f}{}'.format(
+            name, seconds, base, seconds / base if base else float('inf'),
+            '  REGRESSION' if regressed else ''))
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scale', type=float, nargs='+', default=[1],
+                        help='catalog sizes, as multiples of the real one '
+                        '(from 1 to 50)')
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--jobs', type=int, default=amherstgraph.EXPORT_JOBS,
+                        help='export worker processes')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='store the times measured as the baselines')
+    args = parser.parse_args()
+
+    baselines = load_baselines()
+    regressions = []
+    for scale in args.scale:
+        key = 'scale {:g}'.format(scale)
+        times, sizes = measure(scale, args.rounds, args.jobs)
+        print('\n{}: {}'.format(key, ', '.join(
+            '{} {}'.format(count, name) for name, count in sizes.items())))
+        regressions += [key + ' ' + name
+                        for name in compare(times, baselines.get(key, {}))]
+        if args.update_baseline:
+            baselines[key] = {name: round(seconds, 4)
+                              for name, seconds in times.items()}
+
+    if args.update_baseline:
+        with open(BASELINES_PATH, 'w') as baselines_file:
+            json.dump(baselines, baselines_file, indent=2, sort_keys=True)
+        print('\nbaselines updated')
+    elif regressions:
+        print('\nPERFORMANCE REGRESSION in: ' + ', '.join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Checks get_prereqs against the regression corpus of requisite lines in
+prereq_corpus.json, taken from the exported catalog with each entry's
+(prerequisite, course, kind, group) edges checked by hand, then measures its
+throughput in courses per second, alongside the word-splitting loop it
+replaced: over the corpus alone with the line cache emptied (every line
+new), and over the corpus repeated to a catalog of the given size (lines
+recurring, as they do across years of catalogs).  Exits with status 1 if any
+course's extracted prerequisites differ from the corpus.
+
+usage: python benchmarks/bench_prereqs.py [number of courses]
+"""
+
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+import amherstgraph
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           'prereq_corpus.json')
+
+
+def get_prereqs_by_splitting(course_details):
+    "the prerequisite extraction get_prereqs used to do"
+    prereqs = []
+    for k in course_details.keys():
+        rline = course_details[k]["rline"]
+        if len(rline) > 0:
+            rline = rline[0]
+            rline = rline.replace(u'\xa0', u' ')
+            words = re.split(r' |-|,|/|;|\.', rline)
+            current_dept = k[0:4]
+            for word in words:
+                if word.upper() in amherstgraph.DEPTS:
+                    current_dept = word
+                if word.isnumeric() and len(word) == 3:
+                    prereqs.append((current_dept + '-' + word, k))
+    return prereqs
+
+
+def check_corpus(corpus):
+    "prints every corpus entry get_prereqs disagrees with; returns their count"
+    failures = 0
+    for entry in corpus:
+        details = {entry["course"]: {"rline": entry["rline"]}}
+        found = [list(edge) for edge in amherstgraph.get_prereqs(details)]
+        if found != entry["prereqs"]:
+            failures += 1
+            print('{}: expected {}, got {}'.format(entry["course"],
+                                                   entry["prereqs"], found))
+    return failures
+
+
+def time_extractor(extractor, course_details):
+    """
+    returns the best wall-clock time of three runs of an extractor, each
+    starting with an empty line cache
+    """
+    best = None
+    for _ in range(3):
+        amherstgraph.read_requisite_line.cache_clear()
+        time_0 = time.perf_counter()
+        extractor(course_details)
+        elapsed = time.perf_counter() - time_0
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main(number_of_courses=100000):
+    with open(CORPUS_PATH) as corpus_file:
+        corpus = json.load(corpus_file)
+    failures = check_corpus(corpus)
+    print('{} of {} corpus entries match'.format(len(corpus) - failures,
+                                                 len(corpus)))
+
+    # repeat the corpus under distinct course codes to make a large catalog
+    unique_details = {entry["course"]: {"rline": entry["rline"]}
+                      for entry in corpus}
+    course_details = {}
+    for i in range(number_of_courses):
+        entry = corpus[i % len(corpus)]
+        code = '{}-{}'.format(entry["course"], i // len(corpus))
+        course_details[code] = {"rline": entry["rline"]}
+    print('{:>15} {:>18} {:>18}'.format('', 'unique (courses/s)',
+                                        'catalog (courses/s)'))
+    for name, extractor in [('get_prereqs', amherstgraph.get_prereqs),
+                            ('word splitting', get_prereqs_by_splitting)]:
+        unique = time_extractor(extractor, unique_details)
+        catalog = time_extractor(extractor, course_details)
+        print('{:>15} {:>18.0f} {:>18.0f}'.format(
+            name, len(unique_details) / unique, number_of_courses / catalog))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the memory held by the course records of synthetic catalogs of
+growing size, built as the dictionaries course_details used to hold (full
+urls, lists of departments, lxml smart strings for the requisite lines) and
+as CourseRecords.  Every semester a course is offered in gets a record of
+its own, with fresh copies of the course's department, title and
+description strings, as they come from parsing each page.  The trees lxml
+allocates outside Python are not traced, so the figures for the
+dictionaries, whose smart strings keep those trees alive, are understated.
+
+usage: python benchmarks/bench_records.py [largest number of urls]
+"""
+
+import gc
+import random
+import sys
+import tracemalloc
+
+from lxml import html
+
+from synthetic import make_course_urls, make_sentence
+import amherstgraph
+
+
+def make_texts(course_urls, seed=0):
+    """
+    returns a dictionary mapping each course url to its departments, and
+    one mapping each course code to its title, description and requisite
+    line
+    """
+    rng = random.Random(seed)
+    url_depts = {}
+    for dept, urls in course_urls.items():
+        for url in urls:
+            url_depts.setdefault(url, []).append(dept)
+    course_texts = {}
+    for url in url_depts:
+        course_code = url.split('/')[-1].rsplit('-', 1)[0]
+        if course_code not in course_texts:
+            course_texts[course_code] = (
+                make_sentence(rng, 4), make_sentence(rng, 120),
+                'Requisite: {} or consent of the instructor.'.format(
+                    course_code))
+    return url_depts, course_texts
+
+
+def make_record(url, depts, texts, compact):
+    """
+    returns the record of a course url, a CourseRecord if compact, or else a
+    dictionary; every string is a fresh copy, as parsing a page makes it
+    """
+    title, description, rline = [''.join(list(text)) for text in texts]
+    depts = [''.join(list(dept)) for dept in depts]
+    rline = html.fromstring('<p>' + rline + '</p>').xpath('//p/text()')
+    if compact:
+        return amherstgraph.CourseRecord('http://' + url, depts, description,
+                                         rline, title)
+    return {"url": 'http://' + url, "departments": depts,
+            "description": description, "rline": rline, "title": title}
+
+
+def measure_records(url_depts, course_texts, compact):
+    "returns the number of bytes held by the records of url_depts"
+    amherstgraph.STRING_TABLE.clear()
+    gc.collect()
+    tracemalloc.start()
+    records = [make_record(url, depts, course_texts[url.split('/')[-1].
+                                                    rsplit('-', 1)[0]],
+                           compact)
+               for url, depts in url_depts.items()]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    amherstgraph.STRING_TABLE.clear()
+    return size
+
+
+def main(largest=100000):
+    print('{:>8} {:>12} {:>14} {:>10}'.format(
+        'urls', 'dicts (MB)', 'records (MB)', 'ratio'))
+    for size in [largest // 8, largest // 4, largest // 2, largest]:
+        url_depts, course_texts = make_texts(make_course_urls(size))
+        dicts = measure_records(url_depts, course_texts, False)
+        records = measure_records(url_depts, course_texts, True)
+        print('{:>8} {:>12.1f} {:>14.1f} {:>10.1f}'.format(
+            len(url_depts), dicts / 2**20, records / 2**20, dicts / records))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
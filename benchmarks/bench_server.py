@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the latency of the view server.  Builds the stand-in catalog of
+catalog_server.py with `python -m amherstgraph` in a fresh directory, starts
+`python -m amherstgraph.server` there, and requests a set of views twice:
+every department alone, pairs of departments (a major and a minor) and the
+neighborhoods of single courses.  The first requests render the views (cold)
+and the second are answered from the view cache; the benchmark exits with
+status 1 if the 95th percentile of either is over its target.
+
+usage: python benchmarks/bench_server.py [--scale S] [--views N]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from catalog_server import start_server
+import amherstgraph
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COLD_TARGET = 0.5
+CACHED_TARGET = 0.05
+
+
+def get_views(codes, number_of_views, seed=0):
+    """
+    returns the query strings of every department alone, and of
+    number_of_views pairs of departments and course neighborhoods each
+    """
+    rng = random.Random(seed)
+    dept_strings = sorted(amherstgraph.DEPT_CODES)
+    views = ['dept=' + dept_string for dept_string in dept_strings]
+    for _ in range(number_of_views):
+        views.append('dept={}&dept={}'.format(*rng.sample(dept_strings, 2)))
+        views.append('course={}&hops={}'.format(rng.choice(codes),
+                                                 rng.randint(1, 3)))
+    return views
+
+
+def request_views(connection, views):
+    "returns the seconds taken to get the data.json of each view in turn"
+    latencies = []
+    for view in views:
+        time_0 = time.perf_counter()
+        connection.request('GET', '/data.json?' + view)
+        response = connection.getresponse()
+        body = response.read()
+        latencies.append(time.perf_counter() - time_0)
+        if response.status != 200:
+            raise RuntimeError('{} {}: {}'.format(view, response.status,
+                                                  body.decode('utf-8')))
+    return latencies
+
+
+def get_percentile(values, percent):
+    "returns the nearest-rank percentile of a list of numbers"
+    values = sorted(values)
+    return values[max(0, int(round(percent / 100 * len(values))) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scale', type=float, default=1,
+                        help='catalog size, as a multiple of the real one')
+    parser.add_argument('--views', type=int, default=30,
+                        help='pairs of departments and course neighborhoods')
+    args = parser.parse_args()
+
+    catalog_process, catalog_url = start_server(args.scale)
+    directory = tempfile.mkdtemp(prefix='amherstgraph-bench-')
+    env = dict(os.environ, AMHERSTGRAPH_HOST_OVERRIDES=json.dumps(
+        {"www.amherst.edu": catalog_url}),
+               PYTHONPATH=os.pathsep.join([ROOT] + os.environ.get(
+                   'PYTHONPATH', '').split(os.pathsep)).rstrip(os.pathsep))
+    view_process = None
+    try:
+        subprocess.run([sys.executable, '-m', 'amherstgraph'], cwd=directory,
+                       env=env, check=True, stdout=subprocess.DEVNULL)
+        with open(os.path.join(directory, '.build_state',
+                               'catalog.json')) as catalog_file:
+            codes = sorted(set(amherstgraph.get_course_code(url) for urls in
+                               json.load(catalog_file)["course_urls"].values()
+                               for url in urls))
+        view_process = subprocess.Popen(
+            [sys.executable, '-m', 'amherstgraph.server', '--port', '0'],
+            cwd=directory, env=env, stdout=subprocess.PIPE, text=True)
+        server_url = urlsplit(view_process.stdout.readline().split()[-1])
+        connection = http.client.HTTPConnection(server_url.hostname,
+                                                server_url.port)
+        views = get_views(codes, args.views)
+        cold = request_views(connection, views)
+        cached = request_views(connection, views)
+    finally:
+        if view_process is not None:
+            view_process.terminate()
+        catalog_process.terminate()
+        shutil.rmtree(directory)
+
+    failed = False
+    print('{:>8} {:>6} {:>10} {:>10} {:>10} {:>10}'.format(
+        'views', 'count', 'p50 (ms)', 'p95 (ms)', 'max (ms)', 'target'))
+    for name, latencies, target in (('cold', cold, COLD_TARGET),
+                                    ('cached', cached, CACHED_TARGET)):
+        p95 = get_percentile(latencies, 95)
+        print('{:>8} {:>6} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.0f}{}'.format(
+            name, len(latencies), 1e3 * get_percentile(latencies, 50),
+            1e3 * p95, 1e3 * max(latencies), 1e3 * target,
+            '  OVER TARGET' if p95 > target else ''))
+        failed = failed or p95 > target
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
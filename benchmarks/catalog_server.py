@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+A local stand-in for the Amherst College catalog, serving synthetic pages
+at the paths, and with the element ids, that amherstgraph reads: the
+departments page (node-214534), each department's catalog for any semester
+(academics-course-list) and its curriculum page (acad-rltd-crs), and the
+course pages.  Point the crawl at it by setting
+amherstgraph.web.HOST_OVERRIDES, or the AMHERSTGRAPH_HOST_OVERRIDES
+environment variable, to {"www.amherst.edu": <its url>}.
+
+The catalog is scale times the size of the real one: every department
+offers COURSES_PER_DEPT * scale courses, each in about OFFER_RATE of the
+semesters, and some are cross-listed by the next department.  Course
+numbers run from 100 to 499 and then repeat with a letter suffix (MATH-111,
+MATH-111A...), so requisites, which name unsuffixed numbers, keep linking
+courses at every scale.  Every page is made from its url and the seed, so a
+catalog is the same on every run.
+
+usage: python benchmarks/catalog_server.py [scale] [port]
+"""
+
+import http.server
+import multiprocessing
+import random
+import sys
+import urllib.parse
+
+from synthetic import make_course_page
+import amherstgraph
+
+COURSES_PER_DEPT = 40
+OFFER_RATE = 0.6
+CROSS_LIST_RATE = 0.1
+RELATED_PER_DEPT = 5
+DEPARTMENTS_PATH = '/academiclife/departments'
+
+
+def get_course_codes(dept_code, scale):
+    "returns the codes of the courses a department code offers at a scale"
+    codes = []
+    for i in range(int(round(COURSES_PER_DEPT * scale))):
+        suffix = '' if i < 400 else chr(ord('A') + i // 400 - 1)
+        codes.append('{}-{}{}'.format(dept_code, 100 + (i * 7919) % 400,
+                                      suffix))
+    return codes
+
+
+def is_chosen(key, seed, rate):
+    "returns whether the thing named by key is among the fraction rate chosen"
+    return random.Random('{}-{}'.format(key, seed)).random() < rate
+
+
+def get_catalog_listing(dept_string, semester, scale, seed=0):
+    """
+    returns the codes of the courses a department's catalog lists in a
+    semester: those it offers then, and the offered courses of the next
+    department which it cross-lists
+    """
+    dept_strings = list(amherstgraph.DEPT_CODES.keys())
+    next_dept = dept_strings[(dept_strings.index(dept_string) + 1) %
+                             len(dept_strings)]
+    codes = get_course_codes(amherstgraph.DEPT_CODES[dept_string], scale)
+    codes += [code for code in
+              get_course_codes(amherstgraph.DEPT_CODES[next_dept], scale)
+              if is_chosen(code, seed, CROSS_LIST_RATE)]
+    return [code for code in codes
+            if is_chosen(code + semester, seed, OFFER_RATE)]
+
+
+def make_page(title, body):
+    "returns the bytes of a page with a title and body"
+    return ('<!DOCTYPE html><html><head><meta http-equiv="Content-Type" '
+            'content="text/html; charset=utf-8" /><title>{} | Amherst '
+            'College</title></head><body>{}</body></html>'.format(
+                title, body)).encode('utf-8')
+
+
+def make_departments_page():
+    """
+    returns the departments page, listing every department except
+    architectural studies, which get_catalog_urls adds itself
+    """
+    links = ''.join('<li><a href="{}/{}">{}</a></li>'.format(
+        DEPARTMENTS_PATH, dept_string, dept_string)
+                    for dept_string in amherstgraph.DEPT_CODES
+                    if dept_string != 'architectural_studies')
+    return make_page('Departments', '<div id="node-214534"><div><div>'
+                     '<div><div><ul>{}</ul></div></div></div></div>'
+                     '</div>'.format(links))
+
+
+def make_catalog_page(dept_string, semester, scale, seed=0):
+    "returns a department's catalog page for a semester"
+    heads = ''.join(
+        '<div class="coursehead"><a href="{0}/courses/{1}/{2}/{3}-{1}">'
+        '{3}</a></div><div class="coursebody"></div>'.format(
+            DEPARTMENTS_PATH, semester, code[0:4], code)
+        for code in get_catalog_listing(dept_string, semester, scale, seed))
+    return make_page(dept_string, '<div id="academics-course-list">{}'
+                     '</div>'.format(heads))
+
+
+def make_curriculum_page(dept_string, scale, seed=0):
+    """
+    returns a department's curriculum page, naming as related courses a few
+    courses of other departments
+    """
+    rng = random.Random('{}-{}'.format(dept_string, seed))
+    dept_codes = sorted(set(amherstgraph.DEPT_CODES.values()))
+    related = []
+    for _ in range(RELATED_PER_DEPT):
+        related.append(rng.choice(get_course_codes(rng.choice(dept_codes),
+                                                   scale)))
+    divs = ''.join('<div>{} {}</div>'.format(code, code) if i % 2 else
+                   '<div><a href="#">{} {}</a></div>'.format(code, code)
+                   for i, code in enumerate(related))
+    return make_page(dept_string, '<div id="acad-rltd-crs">{}</div>'.format(
+        divs))
+
+
+def get_semesterless_code(name):
+    "returns the course code of a course page name like 'MATH-111-1516F'"
+    return name.rsplit('-', 1)[0]
+
+
+def get_page(path, query, scale, seed=0):
+    "returns the page at a path and query string, or None if there is none"
+    parts = path.strip('/').split('/')
+    if path.rstrip('/') == DEPARTMENTS_PATH:
+        return make_departments_page()
+    if len(parts) == 5 and parts[3] == 'courses' and \
+            parts[2] in amherstgraph.DEPT_CODES:
+        if query == 'display=curriculum':
+            return make_curriculum_page(parts[2], scale, seed)
+        return make_catalog_page(parts[2], parts[4], scale, seed)
+    if len(parts) == 6 and parts[2] == 'courses':
+        return make_course_page(get_semesterless_code(parts[5]), seed)
+    return None
+
+
+class CatalogHandler(http.server.BaseHTTPRequestHandler):
+    "serves the pages of the synthetic catalog"
+    protocol_version = 'HTTP/1.1'
+    scale = 1
+    seed = 0
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        page = get_page(url.path, url.query, self.scale, self.seed)
+        if page is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(page)))
+        self.end_headers()
+        self.wfile.write(page)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_server(scale=1, port=0, seed=0):
+    "returns a server for the catalog at a scale, listening on localhost"
+    handler = type('CatalogHandler', (CatalogHandler,),
+                   {"scale": scale, "seed": seed})
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(scale, seed, ports):
+    "serves the catalog forever, first putting its port in the ports queue"
+    server = make_server(scale, 0, seed)
+    ports.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_server(scale=1, seed=0):
+    """
+    serves the catalog at a scale from a separate process, so that making
+    pages does not compete with the crawl for the interpreter lock, and
+    returns the process and the server's url.  Terminate the process when
+    done.
+    """
+    ports = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve,
+                                      args=(scale, seed, ports),
+                                      daemon=True)
+    process.start()
+    return process, 'http://127.0.0.1:{}'.format(ports.get(timeout=30))
+
+
+if __name__ == "__main__":
+    SERVER = make_server(float(sys.argv[1]) if len(sys.argv) > 1 else 1,
+                         int(sys.argv[2]) if len(sys.argv) > 2 else 8000)
+    print('serving the catalog at http://127.0.0.1:{}'.format(
+        SERVER.server_address[1]))
+    SERVER.serve_forever()
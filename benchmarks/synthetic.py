@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Generators of synthetic Amherst College catalog data shaped like the data
+amherstgraph scrapes, for benchmarking the pipeline without the network.
+Every generator takes a seed, so the same arguments always give the same
+catalog.
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+import amherstgraph
+
+
+def get_semesters(number_of_years, last_year=16):
+    """
+    returns the semester suffixes, e.g. '1516F' and '1516S', of the
+    number_of_years academic years ending with last_year
+    """
+    semesters = []
+    for year in range(last_year - number_of_years + 1, last_year + 1):
+        prefix = '{:02d}{:02d}'.format((year - 1) % 100, year % 100)
+        semesters += [prefix + 'F', prefix + 'S']
+    return semesters
+
+
+def make_course_urls(number_of_urls, seed=0):
+    """
+    returns a course_urls dictionary, as made by get_courses, holding about
+    number_of_urls distinct course urls.  Each course is offered in a few
+    random semesters and listed by one or two departments, and some course
+    numbers carry a letter suffix so that codes like MATH-111 and MATH-111H
+    sit side by side as they do in the real catalog.
+    """
+    rng = random.Random(seed)
+    depts = list(amherstgraph.DEPT_CODES.items())
+    semesters = get_semesters(max(2, number_of_urls // 20000 + 2))
+    course_urls = {dept: [] for dept, code in depts}
+    url_count = 0
+    while url_count < number_of_urls:
+        dept, code = rng.choice(depts)
+        course_code = '{}-{}{}'.format(code, rng.randint(100, 499),
+                                       rng.choice(['', '', '', 'H']))
+        listing_depts = [dept]
+        if rng.random() < 0.2:
+            listing_depts.append(rng.choice(depts)[0])
+        for semester in rng.sample(semesters, rng.randint(1, 4)):
+            url = 'www.amherst.edu/academiclife/departments/courses/' + \
+                '{}/{}/{}-{}'.format(semester, code, course_code, semester)
+            for listing_dept in listing_depts:
+                course_urls[listing_dept].append(url)
+            url_count += 1
+    return course_urls
+
+
+WORDS = ('the of and to in a is that for as with on by this will students '
+         'course we how be from or are an their its history theory study '
+         'readings include social analysis political modern texts examine '
+         'questions methods literature science data culture american').split()
+
+
+def make_sentence(rng, length):
+    "returns a sentence of length random words"
+    return ' '.join(rng.choice(WORDS) for _ in range(length)).capitalize() + \
+        '.'
+
+
+def make_course_page(course_code, seed=0, nav_links=400):
+    """
+    returns the bytes of a synthetic course page laid out like the pages of
+    the real catalog: site navigation (nav_links links of it), then the
+    academics-course-list div holding the title heading, the 'Listed in'
+    paragraph, the description paragraphs and the requisite paragraph,
+    then a footer
+    """
+    rng = random.Random('{}-{}'.format(course_code, seed))
+    dept = course_code[0:4]
+    nav = ''.join('<li class="leaf"><a href="/academiclife/{0}">Page {0}</a>'
+                  '</li>'.format(i) for i in range(nav_links))
+    description = ''.join('<p>{}</p>'.format(
+        ' '.join(make_sentence(rng, rng.randint(8, 25))
+                 for _ in range(rng.randint(2, 6))))
+                          for _ in range(rng.randint(1, 3)))
+    requisite = 'Requisite: {} {} or consent of the instructor. Limited ' \
+        'to {} students.\xa0 Fall semester. Professor {}\u2019s.'.format(
+            dept, rng.randint(100, 399), rng.randint(10, 40),
+            rng.choice(WORDS).capitalize())
+    page = '<!DOCTYPE html><html><head><meta http-equiv="Content-Type" ' \
+        'content="text/html; charset=utf-8" />' \
+        '<title>{0} | Amherst College</title></head><body><div id="header"><ul class="menu">{1}</ul></div>' \
+        '<div id="content"><div id="academics-course-list">' \
+        '<h2>{2}</h2><p>Listed in: <a href="/x">{3}</a>, as {0}<br/>' \
+        ' (Section 01)</p>{4}<p>{5}</p></div></div>' \
+        '<div id="footer"><p>Amherst College, Amherst, MA 01002</p></div>' \
+        '</body></html>'.format(course_code, nav,
+                                make_sentence(rng, rng.randint(2, 6)),
+                                dept, description, requisite)
+    return page.encode('utf-8')
+
+
+def make_course_pages(number_of_pages, seed=0):
+    "returns a list of number_of_pages synthetic course pages"
+    rng = random.Random(seed)
+    depts = amherstgraph.DEPTS
+    return [make_course_page('{}-{}'.format(rng.choice(depts),
+                                            rng.randint(100, 499)), seed)
+            for _ in range(number_of_pages)]
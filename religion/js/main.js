@@ -103,6 +103,22 @@ function initSigma(config) {
 			}
 		
 		);
+
+		//invert the exported chains of prerequisites: the ids of the nodes requiring each node at any remove
+		a.descendants = {};
+		a.iterNodes(function (b) {
+			var ancestors = b.attr.ancestors || [];
+			for (var i = 0; i < ancestors.length; i++) {
+				a.descendants[ancestors[i]] || (a.descendants[ancestors[i]] = []);
+				a.descendants[ancestors[i]].push(b.id);
+			}
+		});
+
+		//the search index exported beside the data, which Search consults instead of scanning every node
+		a.searchIndex = null;
+		if (config.features.search) jQuery.getJSON(config.searchIndex || "search.json", function (index) {
+			a.searchIndex = index;
+		});
 	
 		a.bind("upnodes", function (a) {
 		    nodeActive(a.content[0])
@@ -364,19 +380,35 @@ function Search(a) {
     this.search = function (a) {
         var b = !1,
             c = [],
+            ids = null,
             b = this.exactMatch ? ("^" + a + "$").toLowerCase() : a.toLowerCase(),
             g = RegExp(b);
+        if (!this.exactMatch && sigInst.searchIndex) ids = searchIndex(sigInst.searchIndex, a);
         this.exactMatch = !1;
         this.searching = !0;
         this.lastSearch = a;
         this.results.empty();
         if (2 >= a.length) this.results.html("<i>You must search for a name with a minimum of 3 letters.</i>");
         else {
-            sigInst.iterNodes(function (a) {
-                g.test(a.attr.attributes.Title.toLowerCase()) && c.push({
+            if (ids) {
+                //courses whose code or title matches the search come before those matching only by their description
+                var titles = sigInst.searchIndex.titles, rest = [];
+                for (var id in ids) {
+                    var node = sigInst._core.graph.nodesIndex[id];
+                    if (!node) continue;
+                    (g.test(titles[id].toLowerCase()) || g.test(node.label.toLowerCase()) ? c : rest).push({
+                        id: id,
+                        name: titles[id]
+                    })
+                }
+                c = c.concat(rest);
+            } else sigInst.iterNodes(function (a) {
+                //nodes whose attributes are still in the course store are searched by label
+                var title = a.attr.attributes ? a.attr.attributes.Title : a.label;
+                g.test(title.toLowerCase()) && c.push({
                 //g.test(a.label.toLowerCase()) && c.push({
                     id: a.id,
-                    name: a.attr.attributes.Title
+                    name: title
                 })
             });
             c.length ? (b = !0, nodeActive(c[0].id)) : b = showCluster(a);
@@ -390,6 +422,33 @@ function Search(a) {
     }
 }
 
+function getSearchWords(a) {
+    //the words of a text as search.json holds them: runs of letters and digits, lowercased with their accents dropped
+    return a.normalize("NFKD").replace(/\p{M}/gu, "").toLowerCase().match(/[\p{L}\p{N}]+/gu) || [];
+}
+
+function searchIndex(index, a) {
+    //returns the set of the ids of the nodes having a word starting with each word of a, found by binary searches of the sorted words of the index, or null if a has no words
+    var queryWords = getSearchWords(a),
+        words = index.words,
+        ids = null;
+    for (var i = 0; i < queryWords.length; i++) {
+        var word = queryWords[i],
+            found = {},
+            low = 0,
+            high = words.length;
+        while (low < high) {
+            var middle = (low + high) >> 1;
+            words[middle][0] < word ? low = middle + 1 : high = middle;
+        }
+        for (; low < words.length && 0 == words[low][0].lastIndexOf(word, 0); low++)
+            for (var j = 1; j < words[low].length; j++)
+                if (!ids || ids[words[low][j]]) found[words[low][j]] = !0;
+        ids = found;
+    }
+    return ids;
+}
+
 function Cluster(a) {
     this.cluster = a;
     this.display = !1;
@@ -541,6 +600,22 @@ function nodeActive(a) {
 	} else {
 		f=f.concat(createList(sigInst.neighbors));
 	}
+
+	//the full chains of prerequisites, when the data has them: createList shows and lists their nodes
+	if (b.attr.ancestors) {
+		var chain=function(ids) {
+			var c = {};
+			for (var i = 0; i < ids.length; i++) c[ids[i]] = {name: "", colour: sigInst._core.graph.nodesIndex[ids[i]].color};
+			return c;
+		};
+		var before=chain(b.attr.ancestors),after=chain(sigInst.descendants[a] || []);
+		size=Object.size(before);
+		f.push("<h2>All prerequisites (" + size + ")</h2>");
+		(size>0)? f=f.concat(createList(before)) : f.push("No prerequisites<br>");
+		size=Object.size(after);
+		f.push("<h2>Leads to (" + size + ")</h2>");
+		(size>0)? f=f.concat(createList(after)) : f.push("No later courses<br>");
+	}
 	//b is object of active node -- SAH
     b.hidden = !1;
     b.attr.color = b.color;
@@ -554,6 +629,28 @@ function nodeActive(a) {
             b = a.attr("rel");
     });
     f = b.attr;
+    if (!f.attributes && f.store) {
+        //the attributes are in the shared course store: fetch them once, then show them
+        $GP.info_name.html("<div><span>" + b.label + "</span></div>");
+        $GP.info_data.html("<i>Loading...</i>");
+        jQuery.getJSON((config.store || "../course_store/") + f.store + ".json", function (attributes) {
+            f.attributes = attributes;
+            if (sigInst.active == b.id) showAttributes(b);
+        });
+    } else {
+        showAttributes(b);
+    }
+    $GP.info_data.show();
+    $GP.info_p.html("Connections:");
+    $GP.info.animate({width:'show'},350);
+	$GP.info_donnees.hide();
+	$GP.info_donnees.show();
+    sigInst.active = a;
+    window.location.hash = b.label;
+}
+
+function showAttributes(b) {
+    var f = b.attr;
     if (f.attributes) {
   		var image_attribute = false;
   		if (config.informationPanel.imageAttribute) {
@@ -581,13 +678,6 @@ function nodeActive(a) {
         // Image field for attribute pane
         $GP.info_data.html(e.join("<br/>"))
     }
-    $GP.info_data.show();
-    $GP.info_p.html("Connections:");
-    $GP.info.animate({width:'show'},350);
-	$GP.info_donnees.hide();
-	$GP.info_donnees.show();
-    sigInst.active = a;
-    window.location.hash = b.label;
 }
 
 function showCluster(a) {